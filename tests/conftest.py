@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+import json
+import subprocess
+import http.client
+
+import pytest
+from flask import Flask
+
+from vs_opc import api as tags_api
+from vs_opc.tag_store import TagStore
+
+
+# Shared fixtures for the subprocess-based integration tests. Each fixture
+# starts `python -m vs_opc.plc_gateway_server` in MOCK mode once per test
+# module and hands tests an HTTP client for its REST API. The
+# gateway binds fixed ports (REST 5000, OPC UA 4840) so only one instance can
+# run at a time; module scope guarantees the previous one is gone before the
+# next module starts its own.
+
+
+GATEWAY_CMD = (sys.executable, '-m', 'vs_opc.plc_gateway_server')
+GATEWAY_HOST = '127.0.0.1'
+GATEWAY_PORT = 5000
+HEALTH_PATH = '/api/v1/hmi/health'
+STOP_PATH = '/api/v1/hmi/stop'
+
+# On POSIX skip the close-every-descriptor walk before exec (fds Python opens
+# are non-inheritable anyway) and start the gateway in its own session. Keep
+# the defaults on Windows where close_fds semantics differ.
+_POPEN_KWARGS = {} if os.name == 'nt' else {'close_fds': False, 'start_new_session': True}
+
+
+def _wait_for(pred, timeout=10.0, delay=0.02, max_delay=0.5):
+    """Poll pred() until it returns truthy or timeout seconds pass.
+
+    The sleep between polls starts at `delay` and doubles up to `max_delay`
+    (the same exponential shape as the gateway's reconnect backoff), so a
+    fast-starting gateway is noticed within a few tens of milliseconds.
+    Exceptions from pred() count as "not yet".
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if pred():
+                return True
+        except Exception:
+            pass
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+class GatewayProcess:
+    """A MOCK-mode gateway subprocess plus an HTTP client for its REST API."""
+
+    def __init__(self, tmp_dir, **env_overrides):
+        env = os.environ.copy()
+        env['GATEWAY_MOCK_PLC'] = '1'
+        env.update(env_overrides)
+        self.ready_file = str(tmp_dir / "gateway.ready")
+        env['READY_FILE'] = self.ready_file
+        self.log_file = tmp_dir / "gateway.log"
+        self.err_file = tmp_dir / "gateway.err"
+        self.proc = subprocess.Popen(GATEWAY_CMD,
+                                     stdout=open(self.log_file, "wb"), stderr=open(self.err_file, "wb"),
+                                     env=env, **_POPEN_KWARGS)
+        self.conn = http.client.HTTPConnection(GATEWAY_HOST, GATEWAY_PORT, timeout=1)
+        self.stopped = False
+
+    def request(self, method, path, payload=None, timeout=1):
+        """Send a request to the gateway; return (status, body bytes)."""
+        headers = {}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        # The dev server closes the connection after every response, so
+        # HTTPConnection opens a fresh socket for each request.
+        self.conn.timeout = timeout
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            r = self.conn.getresponse()
+            return r.status, r.read()
+        finally:
+            self.conn.close()
+
+    def get_json(self, path, timeout=1):
+        status, body = self.request('GET', path, timeout=timeout)
+        return status, json.loads(body)
+
+    def wait_until_up(self, timeout=20):
+        """Block until the REST API answers /api/v1/hmi/health."""
+        return _wait_for(lambda: self.request('GET', HEALTH_PATH), timeout)
+
+    def wait_for_ok(self, path, timeout=10):
+        """Block until GET path returns 200."""
+        return _wait_for(lambda: self.request('GET', path)[0] == 200, timeout)
+
+    def wait_ready(self, timeout=20):
+        """Block until the gateway writes READY_FILE (first successful poll)."""
+        return _wait_for(lambda: os.path.exists(self.ready_file), timeout, delay=0.01, max_delay=0.05)
+
+    def stop(self):
+        """POST /api/v1/hmi/stop and return the decoded JSON response."""
+        self.stopped = True
+        status, body = self.request('POST', STOP_PATH, timeout=2)
+        return json.loads(body)
+
+    def stderr_text(self):
+        with open(self.err_file, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read()
+
+    def close(self):
+        if not self.stopped:
+            try:
+                self.stop()
+            except Exception:
+                pass
+        self.conn.close()
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=3)
+            except Exception:
+                self.proc.kill()
+
+
+def _gateway_fixture(tmp_path_factory, **env_overrides):
+    gw = GatewayProcess(tmp_path_factory.mktemp("gateway"), **env_overrides)
+    try:
+        if not gw.wait_until_up():
+            raise AssertionError("Gateway did not start or health endpoint not available")
+        yield gw
+    finally:
+        gw.close()
+
+
+@pytest.fixture(scope='module')
+def gateway(tmp_path_factory):
+    """MOCK gateway with no synthetic reconnect failures."""
+    yield from _gateway_fixture(tmp_path_factory, GATEWAY_MOCK_FAIL_RECONNECT='0')
+
+
+@pytest.fixture(scope='module')
+def gateway_fail_reconnect(tmp_path_factory):
+    """MOCK gateway that pre-populates a forced reconnect failure/backoff."""
+    yield from _gateway_fixture(tmp_path_factory, GATEWAY_MOCK_FAIL_RECONNECT='1')
+
+
+@pytest.fixture(scope='module')
+def app():
+    """Flask app with the tags blueprint registered once per module."""
+    app = Flask(__name__)
+    app.register_blueprint(tags_api.bp)
+    return app
+
+
+@pytest.fixture
+def tag_store():
+    """Fresh TagStore attached to the tags blueprint for each test."""
+    previous = getattr(tags_api.bp, 'tag_store', None)
+    ts = TagStore()
+    tags_api.bp.tag_store = ts
+    yield ts
+    # put back the gateway's store so later tests using gw.app see it
+    tags_api.bp.tag_store = previous
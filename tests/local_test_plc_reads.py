@@ -16,8 +16,19 @@ import sys
 import json
 import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
 from pathlib import Path
-from pprint import pprint
+
+# orjson is optional; it is much faster than pprint/json for the per-cycle dumps
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str).decode('utf-8')
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, indent=2, default=str)
 
 # Hard-coded PLC IPs (from user)
 COMPACTLOGIX_IP = '192.168.32.201'  # MCP5: CompactLogix L35E
@@ -25,7 +36,7 @@ SLC500_IP = '192.168.32.146'        # Mogul1 Depositor SLC 5/05
 
 try:
     # import gateway helper pieces
-    from vs_opc.plc_gateway_server import tag_store, read_compactlogix_tags, read_slc500_tags
+    from vs_opc.plc_gateway_server import tag_store
     try:
         from vs_opc.plc_gateway_server import LogixDriver, SLCDriver
     except Exception:
@@ -42,22 +53,100 @@ except Exception:
 
 from vs_opc.models import Tag
 
-# CLI flags
-parser = argparse.ArgumentParser(description='Local read-only PLC smoke test')
-parser.add_argument('--no-cleanup', action='store_true', help='Do not remove tags from TagStore at the end')
-parser.add_argument('--quiet', '-q', action='store_true', help='Reduce console output (suppress per-cycle dumps)')
-# allow unknown args when imported in other contexts
-args, _ = parser.parse_known_args()
+# CIP requests are limited to ~500 bytes, so multi-tag reads are grouped into
+# chunks of this many addresses (the usual pycomm3/libplctag guidance).
+READ_CHUNK_SIZE = 20
+
+# plc_id -> tuple of chunks, each chunk a tuple of (tag_id, address) pairs.
+# Built once after the config is loaded so the cycle loop doesn't rebuild it.
+READ_CHUNKS = {}
+
+# (plc_id, address) -> (monotonic ts, value) of the last successful read.
+# Mirrors libplctag's read_cache_ms: addresses read within --cache-ms keep
+# their current TagStore value instead of hitting the PLC again.
+_last_read = {}
+
+# Touch each PLC this often so pycomm3 doesn't drop the session when idle
+# and re-upload the tag list on the next read.
+KEEPALIVE_INTERVAL = 60.0
+_last_keepalive = {}
+
+
+def chunk_pairs(pairs, size=READ_CHUNK_SIZE):
+    """Split (tag_id, address) pairs into a tuple of fixed-size chunks."""
+    it = iter(pairs)
+    return tuple(iter(lambda: tuple(islice(it, size)), ()))
 
-# Reduce pycomm3 verbosity by default; make stricter if --quiet passed
-logging.getLogger('pycomm3').setLevel(logging.WARNING)
-if args.quiet:
-    logging.getLogger('pycomm3').setLevel(logging.ERROR)
-    logging.getLogger().setLevel(logging.WARNING)
 
-# runtime flags
-NO_CLEANUP = bool(args.no_cleanup)
-QUIET = bool(args.quiet)
+def read_batched(drv, chunks, pid=None, cache_ms=0):
+    """Issue one multi-tag ``drv.read(*addresses)`` per chunk and store the
+    returned values in the TagStore.
+
+    When cache_ms > 0, addresses successfully read within that window are
+    skipped for this cycle.
+    """
+    now = time.monotonic()
+    ttl = cache_ms / 1000.0
+    for chunk in chunks:
+        if ttl > 0:
+            chunk = tuple(
+                (tid, addr) for tid, addr in chunk
+                if now - _last_read.get((pid, addr), (float('-inf'), None))[0] >= ttl
+            )
+            if not chunk:
+                continue
+        results = drv.read(*[addr for _, addr in chunk])
+        # pycomm3 returns a bare Tag (not a list) for a single address
+        if len(chunk) == 1:
+            results = [results]
+        for (tid, addr), res in zip(chunk, results):
+            if getattr(res, 'error', None) is None:
+                tag_store.set_value(tid, res.value)
+                _last_read[(pid, addr)] = (now, res.value)
+
+
+def keepalive(drv, pid):
+    """Call ``drv.get_plc_time()`` at most once per KEEPALIVE_INTERVAL."""
+    if not hasattr(drv, 'get_plc_time'):
+        return
+    now = time.monotonic()
+    if now - _last_keepalive.get(pid, float('-inf')) < KEEPALIVE_INTERVAL:
+        return
+    _last_keepalive[pid] = now
+    drv.get_plc_time()
+
+
+def read_cycle(drv, pid, cache_ms=0):
+    """One cycle's work for a single PLC: keepalive then batched reads."""
+    # a failed keepalive is reported but must not cost the PLC its reads
+    try:
+        keepalive(drv, pid)
+    except Exception as e:
+        print(f"[WARN] keepalive failed for {pid}: {e}", file=sys.stderr)
+    read_batched(drv, READ_CHUNKS.get(pid, ()), pid=pid, cache_ms=cache_ms)
+
+
+def build_and_register(pid, t):
+    """Build a Tag for plc `pid` from config dict `t` and add it to the TagStore."""
+    get = t.get
+    tag_id = get('tag_id')
+    # support both 'decimals' (short) and legacy 'decimal_places'
+    dec = get('decimals')
+    if dec is None:
+        dec = get('decimal_places')
+    tag = Tag(
+        tag_id=tag_id,
+        name=get('name') or tag_id,
+        plc_id=pid,
+        address=get('address'),
+        data_type=get('data_type', 'Double'),
+        scale_mul=float(get('scale_mul', 1.0)),
+        scale_add=float(get('scale_add', 0.0)),
+        decimals=int(dec) if dec is not None else None,
+        description=get('description'),
+    )
+    tag_store.add_tag(tag, initial_value=get('initial_value'))
+    return tag
 
 
 def safe_open(driver, name):
@@ -83,7 +172,27 @@ def safe_close(driver, name):
         print(f"[WARN] Failed to close driver {name}: {e}", file=sys.stderr)
 
 
-def main():
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Local read-only PLC smoke test')
+    parser.add_argument('--no-cleanup', action='store_true', help='Do not remove tags from TagStore at the end')
+    parser.add_argument('--quiet', '-q', action='store_true', help='Reduce console output (suppress per-cycle dumps)')
+    parser.add_argument('--cache-ms', type=int, default=0, help='Skip re-reading an address read within this many ms (0 disables)')
+    # allow unknown args when invoked via wrappers that pass their own flags
+    return parser.parse_known_args(argv)[0]
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    no_cleanup = bool(args.no_cleanup)
+    quiet = bool(args.quiet)
+    cache_ms = max(0, int(args.cache_ms))
+
+    # Reduce pycomm3 verbosity by default; make stricter if --quiet passed
+    logging.getLogger('pycomm3').setLevel(logging.WARNING)
+    if quiet:
+        logging.getLogger('pycomm3').setLevel(logging.ERROR)
+        logging.getLogger().setLevel(logging.WARNING)
+
     compact_plc_id = 'compactlogix'
     slc_plc_id = 'slc500'
 
@@ -92,37 +201,25 @@ def main():
     if not cfg_path.exists():
         print(f"Config file {cfg_path} not found; aborting")
         return
-    cfg = json.loads(cfg_path.read_text(encoding='utf-8'))
+    # json.loads accepts UTF-8 bytes directly; skip the intermediate str
+    cfg = json.loads(cfg_path.read_bytes())
 
     # keep a mapping of plc_id -> driver instance
     drivers = {}
     # track tag ids we add from the config so cleanup can remove them deterministically
     added_tags = []
+    # plc_id -> [(tag_id, address), ...] used to build the batched read chunks
+    tags_by_plc = {}
 
     for plc in cfg.get('plcs', []):
         pid = plc.get('plc_id')
         host = plc.get('host')
         ptype = plc.get('type', '').lower()
         # register tags for this PLC
-        for t in plc.get('tags', []):
-            tag = Tag(
-                tag_id=t.get('tag_id'),
-                name=t.get('name') or t.get('tag_id'),
-                plc_id=pid,
-                address=t.get('address'),
-                data_type=t.get('data_type', 'Double'),
-                scale_mul=float(t.get('scale_mul', 1.0)),
-                scale_add=float(t.get('scale_add', 0.0)),
-                # support both 'decimals' (short) and legacy 'decimal_places'
-                decimals=(None if t.get('decimals') is None else int(t.get('decimals')))
-                if t.get('decimals') is not None else (
-                    (int(t.get('decimal_places')) if t.get('decimal_places') is not None else None)
-                ),
-                description=t.get('description'),
-            )
-            tag_store.add_tag(tag, initial_value=t.get('initial_value', None))
-            # remember we added this tag so we can remove it at the end
-            added_tags.append(tag.tag_id)
+        built = [build_and_register(pid, t) for t in plc.get('tags', [])]
+        # remember what we added so we can remove it at the end
+        added_tags.extend(tag.tag_id for tag in built)
+        tags_by_plc.setdefault(pid, []).extend((tag.tag_id, tag.address) for tag in built if tag.address)
 
         # instantiate driver objects for each PLC if classes are available
         drv = None
@@ -136,9 +233,11 @@ def main():
             drv = None
         drivers[pid] = {'type': ptype, 'host': host, 'driver': drv}
 
-    if not QUIET:
+    READ_CHUNKS.update({pid: chunk_pairs(pairs) for pid, pairs in tags_by_plc.items()})
+
+    if not quiet:
         print('Tags added to TagStore:')
-        pprint(tag_store.list_tags())
+        print(_dumps(tag_store.list_tags()))
 
     # Open all drivers we instantiated from the config
     for pid, info in drivers.items():
@@ -147,52 +246,71 @@ def main():
         print(f"Opening driver for {pid} @ {host} ...")
         safe_open(drv, pid)
 
+    # PLC reads are independent network round-trips, so run one worker per
+    # PLC and let the cycle take max(read time) instead of sum(read time).
+    ex = ThreadPoolExecutor(max_workers=max(1, len(drivers)))
+
     # Perform 20 reads
     N = 20
     delay = 1.0
+    # Schedule cycles against a monotonic deadline so a slow read shortens the
+    # following sleep instead of pushing every later cycle back.
+    deadline = time.monotonic()
+    # pid -> future of that PLC's last read cycle. pycomm3 drivers are not
+    # thread-safe, so a PLC whose previous read is still running is skipped
+    # this cycle rather than handed to a second worker.
+    pending = {}
     for i in range(N):
+        deadline += delay
         print(f"\nCycle {i+1}/{N}")
-        # For each configured PLC invoke the appropriate read helper
+        # For each configured PLC issue one batched read per address chunk
         for pid, info in drivers.items():
-            drv = info.get('driver')
-            ptype = info.get('type', '')
-            try:
-                if 'compact' in ptype and drv is not None:
-                    read_compactlogix_tags(drv)
-                elif 'slc' in ptype and drv is not None:
-                    read_slc500_tags(drv)
-            except Exception as e:
-                print(f"[ERROR] read failed for {pid}: {e}", file=sys.stderr)
-
-        # Build a dynamic snapshot of all tags currently registered in TagStore
-        vals = {}
-        for tmeta in tag_store.list_tags():
-            tid = tmeta.get('tag_id')
-            try:
-                vals[tid] = tag_store.get_value(tid)
-            except Exception:
-                vals[tid] = None
-        if not QUIET:
-            pprint(vals)
+            if info.get('driver') is None:
+                continue
+            prev = pending.get(pid)
+            if prev is not None and not prev.done():
+                print(f"[WARN] previous read for {pid} still running; skipping this cycle", file=sys.stderr)
+                continue
+            pending[pid] = ex.submit(read_cycle, info['driver'], pid, cache_ms)
+        futs = {fut: pid for pid, fut in pending.items()}
+        done, not_done = wait(futs, timeout=max(0.0, deadline - time.monotonic()))
+        for fut in done:
+            exc = fut.exception()
+            if exc is not None:
+                print(f"[ERROR] read failed for {futs[fut]}: {exc}", file=sys.stderr)
+        for fut in not_done:
+            print(f"[WARN] read for {futs[fut]} still running after {delay}s", file=sys.stderr)
+
+        # Snapshot (scaled) values for the tags this script added in one
+        # call; fall back to the whole store if none were added
+        vals = tag_store.snapshot(scaled=True, tag_ids=added_tags or None)['tags']
+        if not quiet:
+            print(_dumps(vals))
 
+        remaining = deadline - time.monotonic()
+        if remaining < 0:
+            print(f"[WARN] cycle {i+1} overran the {delay}s period by {-remaining:.3f}s", file=sys.stderr)
+            # don't try to catch up with back-to-back reads; restart the cadence
+            deadline = time.monotonic()
         try:
-            time.sleep(delay)
+            time.sleep(max(0.0, remaining))
         except KeyboardInterrupt:
             print('Interrupted by user')
             break
 
+    ex.shutdown(wait=True)
+
     # Cleanup
-    if NO_CLEANUP:
+    if no_cleanup:
         print('\nSkipping tag removal from TagStore (--no-cleanup)')
     else:
         print('\nRemoving tags from TagStore...')
         # remove only the tags we added from the config file
-        for tid in added_tags:
-            try:
-                tag_store.remove_tag(tid)
-            except Exception as e:
-                print(f"[WARN] failed to remove tag {tid}: {e}")
-        if not QUIET:
+        try:
+            tag_store.remove_tags(added_tags)
+        except Exception as e:
+            print(f"[WARN] failed to remove tags: {e}")
+        if not quiet:
             print('Remaining tags:', tag_store.list_tags())
 
     print('Closing drivers...')
@@ -1,22 +1,7 @@
-import json
-import pytest
-from flask import Flask
+from vs_opc.models import Tag
 
-from vs_opc import api as tags_api_module
-from vs_opc.tag_store import TagStore
 
-
-def create_test_app():
-    app = Flask(__name__)
-    ts = TagStore()
-    # attach fresh TagStore to blueprint
-    tags_api_module.bp.tag_store = ts
-    app.register_blueprint(tags_api_module.bp)
-    return app, ts
-
-
-def test_create_and_get_tag():
-    app, ts = create_test_app()
+def test_create_and_get_tag(app, tag_store):
     client = app.test_client()
 
     # create a tag
@@ -46,8 +31,7 @@ def test_create_and_get_tag():
     assert tag['value'] is False
 
 
-def test_patch_update_and_delete():
-    app, ts = create_test_app()
+def test_patch_update_and_delete(app, tag_store):
     client = app.test_client()
 
     # create tag
@@ -77,8 +61,7 @@ def test_patch_update_and_delete():
     assert r.status_code == 404
 
 
-def test_import_replace_all_and_batch_create():
-    app, ts = create_test_app()
+def test_import_replace_all_and_batch_create(app, tag_store):
     client = app.test_client()
 
     # batch create using POST
@@ -103,3 +86,99 @@ def test_import_replace_all_and_batch_create():
     tags = r.get_json()['tags']
     ids = [t['tag_id'] for t in tags]
     assert ids == ['X']
+
+
+def test_malformed_json_body_returns_400(app, tag_store):
+    client = app.test_client()
+    for method, path in (('post', '/api/v1/tags'),
+                         ('patch', '/api/v1/tags/T1'),
+                         ('put', '/api/v1/tags/import')):
+        r = getattr(client, method)(path, data=b'{"tags": [', content_type='application/json')
+        assert r.status_code == 400
+        assert r.get_json() == {'error': 'bad json'}
+
+
+def test_import_rejects_whole_batch_on_invalid_entry(app, tag_store):
+    client = app.test_client()
+    r = client.put('/api/v1/tags/import', json={'tags': [
+        {'tag_id': 'OK1', 'name': 'OK1'},
+        {'address': 'no id'},
+    ]})
+    assert r.status_code == 400
+    assert tag_store.list_tags() == []
+
+
+def test_get_tag_reflects_metadata_and_value_updates(app, tag_store):
+    client = app.test_client()
+    r = client.post('/api/v1/tags', json={'tag_id': 'C1', 'name': 'first', 'initial_value': 1})
+    assert r.status_code == 201
+    assert client.get('/api/v1/tags/C1').get_json()['tag']['name'] == 'first'
+
+    r = client.patch('/api/v1/tags/C1', json={'name': 'second', 'value': 7})
+    assert r.status_code == 200
+    tag = client.get('/api/v1/tags/C1').get_json()['tag']
+    assert tag['name'] == 'second'
+    assert tag['value'] == 7
+
+    # re-created under the same id -> fresh metadata, not the cached entry
+    client.delete('/api/v1/tags/C1')
+    client.post('/api/v1/tags', json={'tag_id': 'C1', 'name': 'third'})
+    assert client.get('/api/v1/tags/C1').get_json()['tag']['name'] == 'third'
+
+
+def test_patch_and_delete_unknown_tag_return_404(app, tag_store):
+    client = app.test_client()
+    assert client.patch('/api/v1/tags/NOPE', json={'name': 'x'}).status_code == 404
+    assert client.patch('/api/v1/tags/NOPE', json={'value': 1}).status_code == 404
+    assert client.delete('/api/v1/tags/NOPE').status_code == 404
+
+
+def test_get_tag_with_unencodable_value_falls_back_to_str(app, tag_store):
+    tag_store.add_tag(Tag('RAW', 'RAW', 'p1', 'A1'), initial_value=b'\x01\x02')
+    r = app.test_client().get('/api/v1/tags/RAW')
+    assert r.status_code == 200
+    assert r.get_json()['tag']['value'] == str(b'\x01\x02')
+
+
+def test_tag_json_cache_is_dropped_with_the_tag(app, tag_store):
+    client = app.test_client()
+    client.post('/api/v1/tags', json={'tag_id': 'D1', 'name': 'D1'})
+    assert client.get('/api/v1/tags/D1').status_code == 200
+    assert 'D1' in tag_store.derived_cache
+    # removed directly through the store, not the DELETE endpoint
+    tag_store.remove_tags(['D1'])
+    assert 'D1' not in tag_store.derived_cache
+
+
+def test_patch_scaling_queues_opc_rewrite(app, tag_store, monkeypatch):
+    from vs_opc import api as tags_api
+
+    client = app.test_client()
+    client.post('/api/v1/tags', json={'tag_id': 'S1', 'name': 'S1', 'initial_value': 3})
+    queued = []
+    monkeypatch.setattr(tags_api, '_OPC_UA_READY', True)
+    monkeypatch.setattr(tags_api, '_queue_opcua_value', lambda tid, v: queued.append((tid, v)))
+    assert client.patch('/api/v1/tags/S1', json={'description': 'd'}).status_code == 200
+    assert queued == []
+    assert client.patch('/api/v1/tags/S1', json={'scale_mul': 2.0}).status_code == 200
+    assert queued == [('S1', 6)]
+    # a value update goes out scaled, as the poller would write it
+    client.patch('/api/v1/tags/S1', json={'value': 5})
+    assert queued[-1] == ('S1', 10)
+
+
+def test_list_tags_streams_in_batches(app, tag_store, monkeypatch):
+    from vs_opc import api as tags_api
+
+    monkeypatch.setattr(tags_api, '_LIST_BATCH', 2)
+    for i in range(5):
+        tag_store.add_tag(Tag(f'B{i}', f'B{i}', 'plcA', f'A{i}'))
+    with app.test_request_context('/api/v1/tags'):
+        chunks = list(tags_api.list_tags().response)
+    # prefix, three batches of at most two tags, suffix
+    assert len(chunks) == 5
+    client = app.test_client()
+    assert [t['tag_id'] for t in client.get('/api/v1/tags').get_json()['tags']] == [f'B{i}' for i in range(5)]
+    for tid in [f'B{i}' for i in range(5)]:
+        tag_store.remove_tag(tid)
+    assert client.get('/api/v1/tags').get_json() == {'tags': []}
@@ -30,3 +30,330 @@ def test_health_includes_last_backoff():
     assert 'plc_health' in body
     assert 'compactlogix' in body['plc_health']
     assert float(body['plc_health']['compactlogix'].get('last_backoff', 0.0)) == 2.5
+
+
+def test_hmi_data_reencodes_tags_only_after_a_store_change():
+    from decimal import Decimal
+
+    from vs_opc.models import Tag
+
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    gw.tag_store.add_tag(Tag('HD_1', 'HD_1', 'compactlogix', 'H.One'))
+    client = gw.app.test_client()
+    try:
+        gw.tag_store.set_value('HD_1', Decimal('1.5'))
+        body = client.get('/api/v1/hmi/data').get_json()
+        assert body['tags']['HD_1'] == 1.5
+        assert isinstance(body['timestamp'], float)
+        cached = gw._hmi_data_cache
+        client.get('/api/v1/hmi/data')
+        assert gw._hmi_data_cache is cached
+        gw.tag_store.set_value('HD_1', 7)
+        assert client.get('/api/v1/hmi/data').get_json()['tags']['HD_1'] == 7
+    finally:
+        gw.tag_store.remove_tags(['HD_1'])
+    assert 'HD_1' not in client.get('/api/v1/hmi/data').get_json()['tags']
+
+
+def test_hmi_config_reencoded_only_after_metadata_changes():
+    from vs_opc.models import Tag
+
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    client = gw.app.test_client()
+
+    def names():
+        tags = client.get('/api/v1/hmi/config').get_json()['tags']
+        return [t['name'] for t in tags if t['tag_id'] == 'HC_1']
+
+    gw.tag_store.add_tag(Tag('HC_1', 'First', 'compactlogix', 'C.One'))
+    try:
+        assert names() == ['First']
+        cached = gw._hmi_config_cache
+        # value changes don't touch the metadata
+        gw.tag_store.set_value('HC_1', 3)
+        client.get('/api/v1/hmi/config')
+        assert gw._hmi_config_cache is cached
+        gw.tag_store.update_tag('HC_1', name='Renamed')
+        assert names() == ['Renamed']
+    finally:
+        gw.tag_store.remove_tag('HC_1')
+    assert names() == []
+
+
+def test_normalize_error_code_priority():
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    assert gw.normalize_error_code('') == 'UNKNOWN'
+    assert gw.normalize_error_code('Forced reconnect failure (test)') == 'FORCED_RECONNECT'
+    assert gw.normalize_error_code('recreate error: socket timed out') == 'RECREATE_ERROR'
+    assert gw.normalize_error_code('Not Connected') == 'NOT_CONNECTED'
+    # timeout outranks socket regardless of where each appears
+    assert gw.normalize_error_code('socket timeout') == 'TIMEOUT'
+    assert gw.normalize_error_code('socket closed') == 'SOCKET_ERROR'
+    assert gw.normalize_error_code('boom') == 'OTHER'
+
+
+def test_error_ring_keeps_newest_entries_in_order():
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    ring = gw.ErrorRing(3)
+    assert len(ring) == 0 and list(ring) == []
+    for i in range(5):
+        ring.add(float(i), 'err %d' % i)
+    assert len(ring) == 3
+    assert list(ring) == [(2.0, 'err 2'), (3.0, 'err 3'), (4.0, 'err 4')]
+    assert ring[-1] == (4.0, 'err 4') and ring[0] == (2.0, 'err 2')
+    assert (ring.last_ts, ring.last_msg) == (4.0, 'err 4')
+    ring.append((5.0, 'err 5'))
+    assert ring[-1] == (5.0, 'err 5')
+    ring.clear()
+    assert len(ring) == 0 and ring.last_msg is None
+
+
+def test_poll_delay_stretches_while_all_plcs_back_off():
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    saved = {k: h['next_attempt'] for k, h in gw.plc_health.items()}
+
+    class Drv:
+        def __init__(self, connected):
+            self.connected = connected
+
+    try:
+        now = gw.time.time()
+        gw.plc_health['compactlogix']['next_attempt'] = now + 30
+        gw.plc_health['slc500']['next_attempt'] = now + 10
+        delay = gw._next_poll_delay(1.0, Drv(False), Drv(False))
+        assert 8 < delay <= 10
+        # one connected PLC keeps the normal cadence
+        assert gw._next_poll_delay(1.0, Drv(True), Drv(False)) == 1.0
+        # never sleep less than a poll period
+        gw.plc_health['slc500']['next_attempt'] = 0
+        assert gw._next_poll_delay(1.0, Drv(False), None) == 1.0
+    finally:
+        for k, v in saved.items():
+            gw.plc_health[k]['next_attempt'] = v
+
+
+def test_state_metrics_pushed_on_transitions_only(monkeypatch):
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+
+    class Recorder:
+        def __init__(self):
+            self.values = []
+
+        def set(self, v):
+            self.values.append(v)
+
+    ch = gw.SimpleNamespace(connected=Recorder(), fail=Recorder(), state=None)
+    monkeypatch.setitem(gw._METRIC_CHILDREN, ('testplc', '10.0.0.1'), ch)
+    for _ in range(3):
+        gw._set_connected_metrics('testplc', '10.0.0.1')
+    for _ in range(3):
+        gw._set_state_metrics('testplc', '10.0.0.1', False, 2)
+    gw._set_connected_metrics('testplc', '10.0.0.1')
+    assert ch.connected.values == [1, 0, 1]
+    assert ch.fail.values == [0, 2, 0]
+
+
+def test_record_read_failure_updates_health_and_metrics(monkeypatch):
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+
+    class Recorder:
+        def __init__(self):
+            self.values = []
+
+        def set(self, v):
+            self.values.append(v)
+
+    ch = gw.SimpleNamespace(connected=Recorder(), fail=Recorder(), recent_count=Recorder(),
+                            recent_ts=Recorder(), recent_code=Recorder(), state=None)
+    monkeypatch.setitem(gw._METRIC_CHILDREN, ('slc500', '10.0.0.2'), ch)
+    health = gw.plc_health['slc500']
+    monkeypatch.setitem(health, 'fail_count', 0)
+    monkeypatch.setitem(health, 'recent_errors', gw.ErrorRing(3))
+    gw._record_read_failure('slc500', '10.0.0.2', 'socket timeout')
+    assert health['ok'] is False
+    assert health['last_error'] == 'socket timeout'
+    assert health['fail_count'] == 1
+    assert health['recent_errors'][-1][1] == 'socket timeout'
+    assert ch.recent_code.values == [gw.ERROR_CODE_VALUES['TIMEOUT']]
+    assert ch.connected.values == [0] and ch.fail.values == [1]
+
+
+def test_dtype_to_variant_mapping():
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    vt = gw.ua.VariantType
+    assert gw._dtype_to_variant('Boolean') == vt.Boolean
+    assert gw._dtype_to_variant('UInt16') == vt.UInt32
+    assert gw._dtype_to_variant('Int32') == vt.Int64
+    assert gw._dtype_to_variant('Float') == vt.Float
+    assert gw._dtype_to_variant('String') == vt.String
+    assert gw._dtype_to_variant(None) == vt.Double
+    assert gw._dtype_to_variant('Decimal') == vt.Double
+
+
+def test_write_opcua_tags_skips_unchanged_values(monkeypatch):
+    import asyncio
+
+    from vs_opc.models import Tag
+
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+
+    class Node:
+        def __init__(self):
+            self.writes = []
+
+        async def write_value(self, value):
+            self.writes.append(value)
+
+    monkeypatch.setattr(gw, 'opcua_server', None)
+    monkeypatch.setattr(gw, '_opc_last_written', {})
+    node = Node()
+    monkeypatch.setattr(gw, 'opcua_vars', {'WR_1': node})
+    gw.tag_store.add_tag(Tag('WR_1', 'WR_1', 'compactlogix', 'W.One'))
+    try:
+        gw.tag_store.set_value('WR_1', 4)
+        asyncio.run(gw._write_opcua_tags({'WR_1': node}, ['WR_1']))
+        asyncio.run(gw._write_opcua_tags({'WR_1': node}, ['WR_1']))
+        assert node.writes == [4]
+        gw.tag_store.set_value('WR_1', 5)
+        asyncio.run(gw._write_opcua_tags({'WR_1': node}, ['WR_1']))
+        assert node.writes == [4, 5]
+        # another writer touched the node; the next poll rewrites it
+        asyncio.run(gw._update_opcua_value_async('WR_1', 9))
+        asyncio.run(gw._write_opcua_tags({'WR_1': node}, ['WR_1']))
+        assert node.writes[-1] == 5
+    finally:
+        gw.tag_store.remove_tags(['WR_1'])
+
+
+def test_write_opcua_tags_retries_writes_the_server_rejects(monkeypatch):
+    import asyncio
+
+    from asyncua import Server, ua
+
+    from vs_opc.models import Tag
+
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+
+    async def run():
+        server = Server()
+        await server.init()
+        ns = await server.register_namespace('urn:test:rejects')
+        objects = server.nodes.objects
+        nodes = {
+            'RJ_D': await objects.add_variable(ns, 'RJ_D', 0.0, ua.VariantType.Double),
+            'RJ_S': await objects.add_variable(ns, 'RJ_S', 'x', ua.VariantType.String),
+            'RJ_I': await objects.add_variable(ns, 'RJ_I', 3, ua.VariantType.Int64),
+        }
+        monkeypatch.setattr(gw, 'opcua_server', server)
+        monkeypatch.setattr(gw, '_opc_vtypes', {
+            'RJ_D': ua.VariantType.Double,
+            'RJ_S': ua.VariantType.String,
+            'RJ_I': ua.VariantType.Int64,
+        })
+        await gw._write_opcua_tags(nodes, list(nodes))
+        dv = await nodes['RJ_D'].read_data_value()
+        return dv, await nodes['RJ_S'].read_value(), await nodes['RJ_I'].read_data_value()
+
+    monkeypatch.setattr(gw, '_opc_last_written', {})
+    gw.tag_store.add_tag(Tag('RJ_D', 'RJ_D', 'compactlogix', 'RJ.D'), initial_value=2.5)
+    gw.tag_store.add_tag(Tag('RJ_S', 'RJ_S', 'compactlogix', 'RJ.S', data_type='String'), initial_value=1.5)
+    # integer node fed a float by the tag's scaling
+    gw.tag_store.add_tag(Tag('RJ_I', 'RJ_I', 'compactlogix', 'RJ.I', data_type='Int32', scale_mul=2.0),
+                         initial_value=21)
+    try:
+        dv, text, idv = asyncio.run(run())
+        assert idv.Value.Value == 42 and idv.Value.VariantType == ua.VariantType.Int64
+        assert dv.Value.Value == 2.5 and dv.ServerTimestamp is not None
+        # a float for a String node is refused (BadTypeMismatch): the node
+        # keeps its value and the tag isn't recorded as written
+        assert text == 'x'
+        assert gw._opc_last_written == {'RJ_D': 2.5, 'RJ_I': 42}
+    finally:
+        gw.tag_store.remove_tags(['RJ_D', 'RJ_S', 'RJ_I'])
+
+
+def test_schedule_on_closed_opc_loop_closes_the_coroutine(monkeypatch):
+    import asyncio
+
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    loop = asyncio.new_event_loop()
+    loop.close()
+    monkeypatch.setattr(gw, 'opcua_loop', loop)
+
+    async def work():
+        pass
+
+    created = []
+
+    def make_work():
+        created.append(work())
+        return created[-1]
+
+    assert gw._schedule_on_opc_loop(make_work) is False
+    # closed, so it is never reported as "never awaited"
+    assert created[0].cr_frame is None
+    # no loop: the coroutine isn't even created
+    monkeypatch.setattr(gw, 'opcua_loop', None)
+    assert gw._schedule_on_opc_loop(make_work) is False
+    assert len(created) == 1
+
+
+def test_queued_opc_value_updates_coalesce_per_tag(monkeypatch):
+    import asyncio
+
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+
+    class Node:
+        def __init__(self):
+            self.writes = []
+
+        async def write_value(self, value):
+            self.writes.append(value)
+
+    a, b = Node(), Node()
+    monkeypatch.setattr(gw, 'opcua_vars', {'Q_A': a, 'Q_B': b})
+
+    async def run():
+        monkeypatch.setattr(gw, 'opcua_loop', asyncio.get_running_loop())
+        # queued from this thread before the loop gets to run the flush
+        for v in (1, 2, 3):
+            gw._queue_opcua_value('Q_A', v)
+        gw._queue_opcua_value('Q_B', 'x')
+        for _ in range(5):
+            await asyncio.sleep(0)
+        await asyncio.gather(*gw._opc_loop_tasks)
+
+    asyncio.run(run())
+    assert a.writes == [3]
+    assert b.writes == ['x']
+    assert gw._pending_opc_values == {}
+
+
+def test_concurrent_shutdowns_stop_the_server_once(monkeypatch):
+    import asyncio
+    import threading
+
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+
+    class FakeServer:
+        stops = 0
+
+        async def stop(self):
+            FakeServer.stops += 1
+            await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(gw, 'opcua_server', FakeServer())
+    monkeypatch.setattr(gw, 'opcua_tasks', [])
+    monkeypatch.setattr(gw, '_PLC_EXECUTORS', {})
+    monkeypatch.setattr(gw, '_poller_stop', None)
+    monkeypatch.setattr(gw, 'shutdown_event', threading.Event())
+    monkeypatch.setattr(gw.tags_api, '_OPC_UA_READY', True)
+
+    async def run():
+        await asyncio.gather(gw._shutdown_gateway(), gw._shutdown_gateway())
+
+    asyncio.run(run())
+    assert FakeServer.stops == 1
+    # a new loop (e.g. a restarted server) gets its own shutdown
+    asyncio.run(run())
+    assert FakeServer.stops == 2
@@ -1,18 +1,11 @@
 from decimal import Decimal
-from flask import Flask
 
-from vs_opc.api import bp
-from vs_opc.tag_store import TagStore
 from vs_opc.models import Tag
+from vs_opc import tag_store as tag_store_module
 
 
-def test_decimal_serialization_roundtrip():
-    app = Flask(__name__)
-    ts = TagStore()
-    # attach tagstore to blueprint and register
-    bp.tag_store = ts
-    app.register_blueprint(bp)
-
+def test_decimal_serialization_roundtrip(app, tag_store):
+    ts = tag_store
     # create a tag with a Decimal initial value containing trailing zeros
     tag = Tag(
         tag_id='t1',
@@ -40,12 +33,8 @@ def test_decimal_serialization_roundtrip():
         assert j['tag']['value'] == '1.2300'
 
 
-def test_list_tags_contains_serialized_values():
-    app = Flask(__name__)
-    ts = TagStore()
-    bp.tag_store = ts
-    app.register_blueprint(bp)
-
+def test_list_tags_contains_serialized_values(app, tag_store):
+    ts = tag_store
     tag = Tag(
         tag_id='t2',
         name='t2',
@@ -61,3 +50,29 @@ def test_list_tags_contains_serialized_values():
         assert 'tags' in j
         # list_tags returns metadata only; ensure endpoint works and returns JSON
         assert isinstance(j['tags'], list)
+
+
+def test_float_snapshot_keeps_decimal_path_for_rounded_tags(tag_store):
+    ts = tag_store
+    ts.add_tag(Tag('f1', 'f1', 'p1', 'A1', scale_mul=2.0, scale_add=0.5), initial_value=3)
+    ts.add_tag(Tag('f2', 'f2', 'p1', 'A2', scale_mul=2.0, decimals=2), initial_value=3)
+    ts.add_tag(Tag('f3', 'f3', 'p1', 'A3', data_type='Bool'), initial_value=True)
+    values = ts.snapshot(scaled=True, tag_ids=['f1', 'f2', 'f3'], floats=True)['tags']
+    assert values['f1'] == 6.5 and type(values['f1']) is float
+    assert values['f2'] == Decimal('6.00') and str(values['f2']) == '6.00'
+    assert values['f3'] is True
+    # unscaled int values are passed through, not turned into floats
+    ts.add_tag(Tag('f4', 'f4', 'p1', 'A4', data_type='Int32'), initial_value=7)
+    value = ts.snapshot(scaled=True, tag_ids=['f4'], floats=True)['tags']['f4']
+    assert value == 7 and type(value) is int
+    # without floats=True scaled values stay Decimal
+    assert ts.snapshot(scaled=True, tag_ids=['f1'])['tags']['f1'] == Decimal('6.5')
+
+
+def test_tags_with_same_decimals_share_quantizer(tag_store):
+    ts = tag_store
+    ts.add_tag(Tag('q1', 'q1', 'p1', 'A1', decimals=2), initial_value=1.005)
+    ts.add_tag(Tag('q2', 'q2', 'p1', 'A2', scale_mul=10.0, decimals='2'), initial_value=0.1234)
+    assert str(ts.get_value('q1')) == '1.01'
+    assert str(ts.get_value('q2')) == '1.23'
+    assert tag_store_module._quantizer(2) is tag_store_module._quantizer(int('2'))
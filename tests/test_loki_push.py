@@ -0,0 +1,105 @@
+import gzip
+import importlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _LokiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    received = []
+    peers = set()
+    gzipped = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+            type(self).gzipped += 1
+        type(self).received.append(json.loads(body))
+        type(self).peers.add(self.client_address)
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_send_to_loki_pushes_in_background(monkeypatch):
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _LokiHandler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.setattr(gw, 'LOKI_PUSH_URL', 'http://127.0.0.1:%d/loki/api/v1/push' % srv.server_port)
+        for i in range(5):
+            gw._send_to_loki({"streams": [{"stream": {"plc": "p"}, "values": [[str(i), "msg %d" % i]]}]})
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if sum(len(p['streams']) for p in _LokiHandler.received) == 5:
+                break
+            time.sleep(0.02)
+        values = [s['values'][0][1] for p in _LokiHandler.received for s in p['streams']]
+        assert values == ['msg %d' % i for i in range(5)]
+        # every push went over the same keep-alive connection
+        assert len(_LokiHandler.peers) == 1
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_full_loki_queue_drops_oldest(monkeypatch):
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    q = gw.queue.Queue(maxsize=2)
+    monkeypatch.setattr(gw, '_loki_queue', q)
+    # pretend the pusher is running so nothing drains the queue
+    monkeypatch.setattr(gw, '_loki_thread', object())
+    monkeypatch.setattr(gw, '_loki_dropped', 0)
+    monkeypatch.setattr(gw, 'LOKI_PUSH_URL', 'http://127.0.0.1:9/loki/api/v1/push')
+    for i in range(3):
+        gw._send_to_loki({"streams": [{"stream": {}, "values": [[str(i), "msg %d" % i]]}]})
+    kept = [q.get_nowait()[1]['streams'][0]['values'][0][1] for _ in range(2)]
+    assert kept == ['msg 1', 'msg 2']
+    assert gw._loki_dropped == 1
+
+
+def test_large_loki_batches_are_gzipped(monkeypatch):
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _LokiHandler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.setattr(_LokiHandler, 'received', [])
+        monkeypatch.setattr(_LokiHandler, 'gzipped', 0)
+        monkeypatch.setattr(gw, 'LOKI_PUSH_URL', 'http://127.0.0.1:%d/loki/api/v1/push' % srv.server_port)
+        gw._send_to_loki({"streams": [{"stream": {"plc": "p"}, "values": [["1", "x" * 2000]]}]})
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and not _LokiHandler.received:
+            time.sleep(0.02)
+        assert _LokiHandler.received[0]['streams'][0]['values'][0][1] == "x" * 2000
+        assert _LokiHandler.gzipped == 1
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_loki_pusher_survives_a_malformed_payload(monkeypatch):
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _LokiHandler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.setattr(gw, 'LOKI_PUSH_URL', 'http://127.0.0.1:%d/loki/api/v1/push' % srv.server_port)
+        gw._send_to_loki(None)
+        gw._send_to_loki({"streams": [{"stream": {"plc": "p"}, "values": [["1", "after-bad"]]}]})
+
+        def values():
+            return [s['values'][0][1] for p in _LokiHandler.received for s in p['streams']]
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and 'after-bad' not in values():
+            time.sleep(0.02)
+        assert 'after-bad' in values()
+    finally:
+        srv.shutdown()
+        srv.server_close()
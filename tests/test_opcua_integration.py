@@ -67,6 +67,21 @@ def test_opcua_node_lifecycle():
         time.sleep(0.05)
     assert 'IT1' not in gateway.opcua_vars
 
+    # bulk import schedules node creation for every imported tag
+    r = client.put('/api/v1/tags/import', json={'tags': [
+        {'tag_id': 'IT2', 'data_type': 'Double', 'initial_value': 1.5},
+        {'tag_id': 'IT3', 'data_type': 'Boolean', 'initial_value': True},
+    ]})
+    assert r.status_code == 200
+    deadline = time.time() + 5.0
+    while time.time() < deadline:
+        if 'IT2' in gateway.opcua_vars and 'IT3' in gateway.opcua_vars:
+            break
+        time.sleep(0.05)
+    assert 'IT2' in gateway.opcua_vars and 'IT3' in gateway.opcua_vars
+    client.delete('/api/v1/tags/IT2')
+    client.delete('/api/v1/tags/IT3')
+
     # schedule server shutdown
     try:
         gateway._schedule_on_opc_loop(gateway._shutdown_gateway)
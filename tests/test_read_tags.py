@@ -0,0 +1,242 @@
+import importlib
+from collections import namedtuple
+
+from vs_opc.models import Tag
+
+# minimal stand-in for pycomm3's Tag result namedtuple
+Result = namedtuple('Result', 'tag value type error')
+
+
+class FakeDriver:
+    """Driver double that records read() calls and echoes one value per address."""
+
+    connected = True
+
+    def __init__(self, values):
+        self.values = values
+        self.calls = []
+
+    def read(self, *addresses):
+        self.calls.append(addresses)
+        results = [Result(a, self.values.get(a), None, None) for a in addresses]
+        return results[0] if len(results) == 1 else results
+
+
+def test_read_compactlogix_tags_with_precomputed_pairs():
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    gw.tag_store.add_tag(Tag('RT_C1', 'RT_C1', 'compactlogix', 'C.One'))
+    gw.tag_store.add_tag(Tag('RT_C2', 'RT_C2', 'compactlogix', 'C.Two'))
+    try:
+        drv = FakeDriver({'C.One': 1.5, 'C.Two': 2.5})
+        gw.read_compactlogix_tags(drv, tags=(('RT_C1', 'C.One'), ('RT_C2', 'C.Two')))
+        assert drv.calls == [('C.One', 'C.Two')]
+        assert gw.tag_store.get_raw_value('RT_C1') == 1.5
+        assert gw.tag_store.get_raw_value('RT_C2') == 2.5
+        assert gw.plc_health['compactlogix']['ok'] is True
+    finally:
+        gw.tag_store.remove_tags(['RT_C1', 'RT_C2'])
+
+
+def test_read_slc500_tags_with_precomputed_pairs():
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    gw.tag_store.add_tag(Tag('RT_S1', 'RT_S1', 'slc500', 'N7:0', data_type='Int32'))
+    try:
+        drv = FakeDriver({'N7:0': 42})
+        gw.read_slc500_tags(drv, tags=(('RT_S1', 'N7:0'),))
+        assert gw.tag_store.get_raw_value('RT_S1') == 42
+        assert gw.plc_health['slc500']['ok'] is True
+    finally:
+        gw.tag_store.remove_tags(['RT_S1'])
+
+
+def test_read_compactlogix_tags_uses_cached_store_index():
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    ts = gw.tag_store
+    ts.add_tag(Tag('RT_I1', 'RT_I1', 'compactlogix', 'I.One'))
+    ts.add_tag(Tag('RT_I2', 'RT_I2', 'compactlogix', 'I.Two'))
+    try:
+        addresses, tag_ids = ts.addresses_for('compactlogix')
+        assert 'I.One' in addresses and 'RT_I2' in tag_ids
+        assert ts.addresses_for('compactlogix') is ts.addresses_for('compactlogix')
+
+        # disabling a tag invalidates the cached index
+        ts.update_tag('RT_I2', enabled=False)
+        addresses, tag_ids = ts.addresses_for('compactlogix')
+        assert 'I.Two' not in addresses and 'RT_I2' not in tag_ids
+
+        drv = FakeDriver({a: 1 for a in addresses})
+        gw.read_compactlogix_tags(drv)
+        assert drv.calls == [tuple(addresses)]
+        assert ts.get_raw_value('RT_I1') == 1
+    finally:
+        ts.remove_tags(['RT_I1', 'RT_I2'])
+
+
+def test_readers_accept_one_shot_iterators(caplog):
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    gw.tag_store.add_tag(Tag('RT_G1', 'RT_G1', 'compactlogix', 'G.One'))
+    gw.tag_store.add_tag(Tag('RT_G2', 'RT_G2', 'slc500', 'N7:5', data_type='Int32'))
+    try:
+        drv = FakeDriver({'G.One': 3.5})
+        gw.read_compactlogix_tags(drv, tags=iter([('RT_G1', 'G.One')]))
+        assert drv.calls == [('G.One',)]
+        assert gw.tag_store.get_raw_value('RT_G1') == 3.5
+
+        with caplog.at_level('INFO', logger=gw.logger.name):
+            gw.read_slc500_tags(FakeDriver({'N7:5': 9}), tags=(p for p in [('RT_G2', 'N7:5')]))
+        assert gw.tag_store.get_raw_value('RT_G2') == 9
+        assert 'SLC 500 Read: updated 1 tags' in caplog.text
+    finally:
+        gw.tag_store.remove_tags(['RT_G1', 'RT_G2'])
+
+
+def test_reads_report_only_changed_tags():
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    gw.tag_store.add_tag(Tag('RT_D1', 'RT_D1', 'compactlogix', 'D.One'))
+    gw.tag_store.add_tag(Tag('RT_D2', 'RT_D2', 'compactlogix', 'D.Two'))
+    pairs = (('RT_D1', 'D.One'), ('RT_D2', 'D.Two'))
+    try:
+        drv = FakeDriver({'D.One': 1, 'D.Two': 2})
+        assert gw.read_compactlogix_tags(drv, tags=pairs) == ['RT_D1', 'RT_D2']
+        assert gw.read_compactlogix_tags(drv, tags=pairs) == []
+        drv.values['D.Two'] = 3
+        assert gw.read_compactlogix_tags(drv, tags=pairs) == ['RT_D2']
+        # a type change is a change even when the values compare equal
+        drv.values['D.One'] = 1.0
+        assert gw.read_compactlogix_tags(drv, tags=pairs) == ['RT_D1']
+    finally:
+        gw.tag_store.remove_tags(['RT_D1', 'RT_D2'])
+
+
+def test_read_slc500_tags_batches_addresses(monkeypatch):
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    pairs = tuple(('RT_B%d' % i, 'N7:%d' % i) for i in range(5))
+    for tid, addr in pairs:
+        gw.tag_store.add_tag(Tag(tid, tid, 'slc500', addr, data_type='Int32'))
+    try:
+        drv = FakeDriver({addr: i + 1 for i, (_, addr) in enumerate(pairs)})
+        assert gw.read_slc500_tags(drv, tags=pairs) == [tid for tid, _ in pairs]
+        assert drv.calls == [tuple(addr for _, addr in pairs)]
+
+        # small budget: 6 bytes per address, so two addresses per request
+        monkeypatch.setattr(gw, '_chunk_addresses',
+                            lambda p, limit=12, f=gw._chunk_addresses: f(p, limit))
+        drv.calls.clear()
+        gw.read_slc500_tags(drv, tags=pairs)
+        assert [len(c) for c in drv.calls] == [2, 2, 1]
+    finally:
+        gw.tag_store.remove_tags([tid for tid, _ in pairs])
+
+
+def test_read_slc500_tags_falls_back_per_address_for_failed_chunk():
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    pairs = (('RT_F1', 'N7:10'), ('RT_F2', 'N7:11'))
+    for tid, addr in pairs:
+        gw.tag_store.add_tag(Tag(tid, tid, 'slc500', addr, data_type='Int32'))
+
+    class NoMultiRead(FakeDriver):
+        def read(self, *addresses):
+            if len(addresses) > 1:
+                raise RuntimeError('multi-read not supported')
+            return super().read(*addresses)
+
+    try:
+        drv = NoMultiRead({'N7:10': 7, 'N7:11': 8})
+        assert gw.read_slc500_tags(drv, tags=pairs) == ['RT_F1', 'RT_F2']
+        assert drv.calls == [('N7:10',), ('N7:11',)]
+        assert gw.tag_store.get_raw_value('RT_F2') == 8
+    finally:
+        gw.tag_store.remove_tags([tid for tid, _ in pairs])
+
+
+def test_address_index_is_cached_until_tags_change():
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    ts = gw.tag_store
+    ts.add_tag(Tag('RT_A1', 'RT_A1', 'slc500', 'N7:40'))
+    try:
+        index = ts.address_index()
+        assert index['N7:40'] == 'RT_A1'
+        assert ts.address_index() is index
+        ts.update_tag('RT_A1', address='N7:41')
+        assert ts.address_index()['N7:41'] == 'RT_A1'
+        assert 'N7:40' not in ts.address_index()
+    finally:
+        ts.remove_tags(['RT_A1'])
+
+
+def test_per_address_read_tracebacks_are_rate_limited(caplog, monkeypatch):
+    gw = importlib.import_module('vs_opc.plc_gateway_server')
+    monkeypatch.setattr(gw, '_read_tb_ts', {})
+    pairs = (('RT_E1', 'N7:20'), ('RT_E2', 'N7:21'))
+    for tid, addr in pairs:
+        gw.tag_store.add_tag(Tag(tid, tid, 'slc500', addr, data_type='Int32'))
+
+    class Broken(FakeDriver):
+        def read(self, *addresses):
+            raise RuntimeError('link down')
+
+    try:
+        with caplog.at_level('WARNING', logger=gw.logger.name):
+            assert gw.read_slc500_tags(Broken({}), tags=pairs) == []
+        records = [r for r in caplog.records if 'per-address read failed' in r.getMessage()]
+        assert len(records) == 2
+        assert records[0].exc_info is not None
+        assert records[1].exc_info is None
+    finally:
+        gw.tag_store.remove_tags([tid for tid, _ in pairs])
+
+
+def test_snapshot_is_safe_against_concurrent_tag_changes():
+    import threading
+
+    from vs_opc.tag_store import TagStore
+
+    store = TagStore()
+    stop = threading.Event()
+
+    def churn():
+        i = 0
+        while not stop.is_set():
+            store.add_tag(Tag(f'C{i}', f'C{i}', 'slc500', f'N7:{i}'))
+            store.set_value(f'C{i}', i)
+            if i >= 50:
+                store.remove_tag(f'C{i - 50}')
+            i += 1
+
+    t = threading.Thread(target=churn)
+    t.start()
+    try:
+        for _ in range(2000):
+            store.snapshot()
+            store.snapshot(scaled=True)
+            store.snapshot_copy()
+    finally:
+        stop.set()
+        t.join()
+
+
+
+def test_snapshot_copy_only_contains_tags():
+    from vs_opc.tag_store import TagStore
+
+    store = TagStore()
+    store.add_tag(Tag('V1', 'V1', 'slc500', 'N7:0'), initial_value=1)
+    store.add_tag(Tag('V2', 'V2', 'slc500', 'N7:1'), initial_value=2)
+    store.remove_tag('V2')
+    # e.g. a poller write landing after the tag was deleted
+    store.set_value('V2', 5)
+    copy = store.snapshot_copy()['tags']
+    assert copy == store.snapshot()['tags'] == {'V1': 1}
+    store.set_value('V1', 2)
+    assert copy == {'V1': 1}
+
+
+def test_update_tag_bumps_revision():
+    from vs_opc.tag_store import TagStore
+
+    store = TagStore()
+    store.add_tag(Tag('R1', 'R1', 'slc500', 'N7:0'), initial_value=2)
+    rev = store.revision
+    store.update_tag('R1', scale_mul=3.0)
+    assert store.revision > rev
+    assert store.snapshot(scaled=True)['tags']['R1'] == 6
@@ -1,23 +1,87 @@
-from flask import Blueprint, jsonify, request, Response
+from flask import Blueprint, request, Response
+import dataclasses
+import datetime as _dt
+import functools
+import itertools
 import json as _json
+import operator
+import uuid
 from decimal import Decimal
+# orjson serializes several times faster than stdlib json; fall back to the
+# stdlib when it isn't installed so the API keeps working either way.
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+# Naive datetimes are reported as UTC; numpy values (if a driver hands any
+# back) are encoded natively instead of going through _default.
+_ORJSON_OPTS = (orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
 from .tag_store import TagStore
 from .models import Tag
 
 bp = Blueprint('tags_api', __name__)
 
+# Tag metadata fields returned by GET /api/v1/tags/<tag_id>, read in one C
+# call via attrgetter rather than one attribute load per field.
+_TAG_FIELDS = (
+    'tag_id', 'name', 'plc_id', 'address', 'data_type', 'group_id',
+    'description', 'enabled', 'project_id', 'scale_mul', 'scale_add',
+    'writable', 'client_visible',
+)
+_tag_getter = operator.attrgetter(*_TAG_FIELDS)
+
+# Tag fields a PATCH may change; anything else in the payload is ignored.
+_PATCH_ALLOWED = frozenset((
+    'name', 'plc_id', 'address', 'data_type', 'group_id', 'description',
+    'enabled', 'project_id', 'scale_mul', 'scale_add', 'writable',
+    'client_visible',
+))
+# Tags encoded per chunk of the streamed GET /api/v1/tags response
+_LIST_BATCH = 256
+# PATCH fields that change the value get_value() returns for a tag
+_SCALING_FIELDS = frozenset(('scale_mul', 'scale_add'))
+
 # We'll import/create the TagStore lazily so importing this module doesn't
 # force initialization order in the main server. The main server will set
 # bp.tag_store before registering the blueprint.
 bp.tag_store: TagStore = None  # type: ignore
 
+# OPC UA mutation hooks. plc_gateway_server assigns these once at import so
+# handlers don't re-import it per request; importing it from here would be
+# circular and, under `python -m vs_opc.plc_gateway_server`, would load a
+# second copy of the gateway with its own idle loop and TagStore. They stay
+# None when the API is used without the gateway (e.g. unit tests).
+_schedule_on_opc_loop = None
+_create_opcua_node_async = None
+_create_opcua_nodes_bulk_async = None
+_delete_opcua_node_async = None
+_queue_opcua_value = None
+# Set by the gateway once its OPC UA loop is running and cleared when it shuts
+# down, so write paths check one bool instead of attempting to schedule.
+_OPC_UA_READY = False
+
 
 @bp.route('/api/v1/tags', methods=['GET'])
 def list_tags():
     ts: TagStore = bp.tag_store
     if ts is None:
         return _json_response({'tags': []})
-    return _json_response({'tags': ts.list_tags()})
+
+    # Serialize the tags as the response is written instead of building the
+    # whole list of dicts and then encoding it in one go. Tags are joined in
+    # batches so a large store costs one socket write per batch, not per tag.
+    def _stream(tags):
+        yield b'{"tags":['
+        sep = b''
+        while True:
+            batch = [_dumps(d) for d in itertools.islice(tags, _LIST_BATCH)]
+            if not batch:
+                break
+            yield sep + b','.join(batch)
+            sep = b','
+        yield b']}'
+
+    return Response(_stream(ts.iter_tag_dicts()), mimetype='application/json')
 
 
 @bp.route('/api/v1/tags', methods=['POST'])
@@ -25,7 +89,10 @@ def add_tag():
     ts: TagStore = bp.tag_store
     if ts is None:
         return _json_response({'error': 'TagStore not initialized'}, status=500)
-    payload = request.get_json() or {}
+    try:
+        payload = _loads_body() or {}
+    except ValueError:
+        return _json_response({'error': 'bad json'}, status=400)
     # support single tag or batch
     if 'tags' in payload:
         tags = payload['tags']
@@ -35,28 +102,11 @@ def add_tag():
     created = []
     for t in tags:
         try:
-            tag_obj = Tag(
-                tag_id=t.get('tag_id') or t.get('name'),
-                name=t.get('name', t.get('tag_id')),
-                plc_id=t.get('plc_id', 'plc_1'),
-                address=t.get('address', ''),
-                data_type=t.get('data_type', 'Double'),
-                group_id=t.get('group_id', 'default'),
-                description=t.get('description'),
-                project_id=t.get('project_id'),
-                scale_mul=float(t.get('scale_mul', 1.0)),
-                scale_add=float(t.get('scale_add', 0.0)),
-                writable=bool(t.get('writable', False)),
-                enabled=bool(t.get('enabled', True)),
-                client_visible=t.get('client_visible', []),
-            )
+            tag_obj = _build_tag_from_payload(t)
             ts.add_tag(tag_obj, initial_value=t.get('initial_value'))
-            # Attempt to create an OPC UA node for the new tag if the
-            # OPC UA server is running. This is best-effort; scheduling may
-            # be a no-op in unit tests where the OPC UA loop is not active.
-            try:
-                # import here to avoid a hard dependency from this module
-                from .plc_gateway_server import _schedule_on_opc_loop, _create_opcua_node_async
+            # Create an OPC UA node for the new tag if the OPC UA server is
+            # running (never the case in unit tests without the gateway).
+            if _OPC_UA_READY:
                 _schedule_on_opc_loop(_create_opcua_node_async, {
                     'tag_id': tag_obj.tag_id,
                     'data_type': tag_obj.data_type,
@@ -64,24 +114,55 @@ def add_tag():
                     'description': tag_obj.description,
                     'writable': tag_obj.writable,
                 })
-            except Exception:
-                pass
             created.append(tag_obj.tag_id)
         except Exception as e:
-            return jsonify({'error': str(e)}), 400
+            return _json_response({'error': str(e)}, status=400)
 
     return _json_response({'created': created}, status=201)
 
 
+def _build_tag_from_payload(t: dict) -> Tag:
+    """Build a Tag from a REST payload dict, applying the API defaults.
+
+    Arguments are passed positionally in Tag field order to avoid building
+    a kwargs dict per tag on bulk imports.
+    """
+    get = t.get
+    raw_id = get('tag_id')
+    return Tag(
+        raw_id or get('name'),               # tag_id
+        get('name', raw_id),                 # name
+        get('plc_id', 'plc_1'),              # plc_id
+        get('address', ''),                  # address
+        get('data_type', 'Double'),          # data_type
+        get('group_id', 'default'),          # group_id
+        get('project_id'),                   # project_id
+        float(get('scale_mul', 1.0)),        # scale_mul
+        float(get('scale_add', 0.0)),        # scale_add
+        None,                                # decimals
+        bool(get('writable', False)),        # writable
+        get('description'),                  # description
+        bool(get('enabled', True)),          # enabled
+        get('client_visible', []),           # client_visible
+    )
+
+
 def _validate_tag_payload(d: dict):
     if not isinstance(d, dict):
         return False, 'tag must be an object'
     tag_id = d.get('tag_id') or d.get('name')
-    if not tag_id or not isinstance(tag_id, str):
+    dt = d.get('data_type') or 'Double'
+    # The outcome depends only on this fingerprint, so homogeneous bulk
+    # imports hit the cache after the first tag.
+    return _validate_shape(type(tag_id), bool(tag_id), type(dt))
+
+
+@functools.lru_cache(maxsize=32)
+def _validate_shape(id_type: type, has_id: bool, dt_type: type):
+    if not has_id or not issubclass(id_type, str):
         return False, 'tag_id or name is required and must be a string'
     # Basic datatype check
-    dt = d.get('data_type') or 'Double'
-    if not isinstance(dt, str):
+    if not issubclass(dt_type, str):
         return False, 'data_type must be a string'
     return True, ''
 
@@ -113,22 +194,21 @@ def get_tag(tag_id: str):
     if isinstance(raw, _D) and isinstance(val, _D):
         out_val = str(val)
 
-    return _json_response({'tag': {
-        'tag_id': tag.tag_id,
-        'name': tag.name,
-        'plc_id': tag.plc_id,
-        'address': tag.address,
-        'data_type': tag.data_type,
-        'group_id': tag.group_id,
-        'description': tag.description,
-        'enabled': tag.enabled,
-        'project_id': tag.project_id,
-        'scale_mul': tag.scale_mul,
-        'scale_add': tag.scale_add,
-        'writable': tag.writable,
-        'client_visible': tag.client_visible,
-        'value': out_val
-    }})
+    # The metadata rarely changes, so its encoded form is cached per tag and
+    # only the value is serialized per request. The entry is reused only for
+    # the same Tag object at the same version, so a tag that was updated or
+    # deleted and re-created under the same id is re-encoded. The cache lives
+    # on the TagStore, which drops entries as tags are removed or replaced.
+    # Entries are (Tag, Tag.version, encoded '{"tag":{...' metadata prefix).
+    cache = ts.derived_cache
+    cached = cache.get(tag_id)
+    if cached is None or cached[0] is not tag or cached[1] != tag.version:
+        version = tag.version
+        # drop the closing '}}' so the value can be appended as the last field
+        prefix = _dumps({'tag': dict(zip(_TAG_FIELDS, _tag_getter(tag)))})[:-2]
+        cache[tag_id] = cached = (tag, version, prefix)
+    body = cached[2] + b',"value":' + _dumps(out_val, default=_value_default) + b'}}'
+    return Response(body, mimetype='application/json')
 
 
 @bp.route('/api/v1/tags/<tag_id>', methods=['PATCH'])
@@ -136,37 +216,41 @@ def patch_tag(tag_id: str):
     ts: TagStore = bp.tag_store
     if ts is None:
         return _json_response({'error': 'TagStore not initialized'}, status=500)
-    payload = request.get_json() or {}
+    try:
+        payload = _loads_body() or {}
+    except ValueError:
+        return _json_response({'error': 'bad json'}, status=400)
     if not payload:
         return _json_response({'error': 'empty payload'}, status=400)
     # Only allow specific fields to be updated
-    allowed = {'name', 'plc_id', 'address', 'data_type', 'group_id', 'description', 'enabled', 'project_id', 'scale_mul', 'scale_add', 'writable', 'client_visible'}
-    updates = {k: v for k, v in payload.items() if k in allowed}
+    updates = {k: v for k, v in payload.items() if k in _PATCH_ALLOWED}
     if not updates and 'value' not in payload:
-        return jsonify({'error': 'no updatable fields provided'}), 400
+        return _json_response({'error': 'no updatable fields provided'}, status=400)
 
-    tag = ts.get_tag(tag_id)
-    if not tag:
-        return _json_response({'error': 'not found'}, status=404)
-
-    # Update metadata
+    # Update metadata; update_tag raises KeyError for an unknown tag so the
+    # existence check and the update share one store lookup.
     if updates:
-        ts.update_tag(tag_id, **updates)
+        try:
+            ts.update_tag(tag_id, **updates)
+        except KeyError:
+            return _json_response({'error': 'not found'}, status=404)
+    elif ts.get_tag(tag_id) is None:
+        return _json_response({'error': 'not found'}, status=404)
 
     # Optionally update current value
     if 'value' in payload:
         try:
             ts.set_value(tag_id, payload['value'])
-            # reflect value change into OPC UA node if present
-            try:
-                from .plc_gateway_server import _schedule_on_opc_loop, _update_opcua_value_async
-                _schedule_on_opc_loop(_update_opcua_value_async, tag_id, payload['value'])
-            except Exception:
-                pass
         except Exception as e:
-            return jsonify({'error': str(e)}), 400
+            return _json_response({'error': str(e)}, status=400)
+
+    # Reflect a new value or new scaling into the OPC UA node. The poller
+    # only rewrites nodes whose raw PLC value changed, so a scaling change
+    # would otherwise not show up there until the next one.
+    if _OPC_UA_READY and ('value' in payload or not _SCALING_FIELDS.isdisjoint(updates)):
+        _queue_opcua_value(tag_id, ts.get_value(tag_id))
 
-    return jsonify({'updated': tag_id})
+    return _json_response({'updated': tag_id})
 
 
 @bp.route('/api/v1/tags/<tag_id>', methods=['DELETE'])
@@ -174,16 +258,11 @@ def delete_tag(tag_id: str):
     ts: TagStore = bp.tag_store
     if ts is None:
         return _json_response({'error': 'TagStore not initialized'}, status=500)
-    tag = ts.get_tag(tag_id)
-    if not tag:
+    if not ts.remove_tag(tag_id):
         return _json_response({'error': 'not found'}, status=404)
-    ts.remove_tag(tag_id)
     # attempt to remove OPC UA node as well
-    try:
-        from .plc_gateway_server import _schedule_on_opc_loop, _delete_opcua_node_async
+    if _OPC_UA_READY:
         _schedule_on_opc_loop(_delete_opcua_node_async, tag_id)
-    except Exception:
-        pass
     return _json_response({'deleted': tag_id})
 
 
@@ -196,47 +275,79 @@ def import_tags():
     if ts is None:
         return _json_response({'error': 'TagStore not initialized'}, status=500)
     replace_all = request.args.get('replace_all', 'false').lower() in ('1', 'true', 'yes')
-    payload = request.get_json() or {}
+    try:
+        payload = _loads_body() or {}
+    except ValueError:
+        return _json_response({'error': 'bad json'}, status=400)
     tags = payload.get('tags')
     if not isinstance(tags, list):
         return _json_response({'error': 'tags must be a list'}, status=400)
-    # optional replace
-    if replace_all:
-        ts.clear_tags()
-
-    created = []
+    # Phase 1: validate and build every Tag before touching the store so a
+    # bad entry rejects the whole import instead of leaving it half-applied.
+    tag_objs = []
+    initial_values = []
     for t in tags:
         ok, msg = _validate_tag_payload(t)
         if not ok:
-            return jsonify({'error': msg}), 400
-        tag_obj = Tag(
-            tag_id=t.get('tag_id') or t.get('name'),
-            name=t.get('name', t.get('tag_id')),
-            plc_id=t.get('plc_id', 'plc_1'),
-            address=t.get('address', ''),
-            data_type=t.get('data_type', 'Double'),
-            group_id=t.get('group_id', 'default'),
-            description=t.get('description'),
-            project_id=t.get('project_id'),
-            scale_mul=float(t.get('scale_mul', 1.0)),
-            scale_add=float(t.get('scale_add', 0.0)),
-            writable=bool(t.get('writable', False)),
-            enabled=bool(t.get('enabled', True)),
-            client_visible=t.get('client_visible', []),
-        )
-        ts.add_tag(tag_obj, initial_value=t.get('initial_value'))
-        # schedule OPC UA node creation for imported tag
+            return _json_response({'error': msg}, status=400)
         try:
-            from .plc_gateway_server import _schedule_on_opc_loop, _create_opcua_node_async
-            _schedule_on_opc_loop(_create_opcua_node_async, {
-                'tag_id': tag_obj.tag_id,
-                'data_type': tag_obj.data_type
-            })
+            tag_objs.append(_build_tag_from_payload(t))
+        except Exception as e:
+            return _json_response({'error': str(e)}, status=400)
+        initial_values.append(t.get('initial_value'))
+
+    # Phase 2: apply under one store lock per step.
+    if replace_all:
+        ts.clear_tags()
+    ts.add_tags_bulk(tag_objs, initial_values)
+
+    # Phase 3: create all OPC UA nodes in one scheduled coroutine.
+    if tag_objs and _OPC_UA_READY:
+        _schedule_on_opc_loop(_create_opcua_nodes_bulk_async, [
+            {'tag_id': tag_obj.tag_id, 'data_type': tag_obj.data_type}
+            for tag_obj in tag_objs
+        ])
+
+    return _json_response({'imported': [tag_obj.tag_id for tag_obj in tag_objs]}, status=200)
+
+
+def _default(o):
+    """JSON fallback for types the serializer doesn't handle natively.
+
+    Decimal becomes an int when it has no fractional digits, else a float.
+    orjson already encodes datetime/date/time, UUID and dataclasses in C;
+    the same types are converted here only for the stdlib json fallback.
+    Anything else raises TypeError rather than being silently stringified.
+    """
+    if isinstance(o, Decimal):
+        # Read the exponent from as_tuple() rather than comparing against
+        # to_integral_value(), which allocates a new Decimal per value.
+        # NaN/Infinity have a str exponent; the TypeError sends them to float.
+        try:
+            if o.as_tuple().exponent >= 0:
+                return int(o)
         except Exception:
             pass
-        created.append(tag_obj.tag_id)
+        try:
+            return float(o)
+        except Exception:
+            return str(o)
+    if isinstance(o, (_dt.datetime, _dt.date, _dt.time)):
+        return o.isoformat()
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
 
-    return _json_response({'imported': created}, status=200)
+def _value_default(o):
+    """_default for tag values: whatever a driver stored (bytes, structs...)
+    is reported as its str() rather than failing the whole response."""
+    try:
+        return _default(o)
+    except TypeError:
+        return str(o)
 
 
 def _json_response(obj, status=200):
@@ -245,28 +356,28 @@ def _json_response(obj, status=200):
     for fractional). This preserves Decimal internally but presents numbers
     as JSON numbers for clients and tests that expect numeric types.
     """
-    def _convert(o):
-        # Convert Decimal instances to int if integral, else float.
-        if isinstance(o, Decimal):
-            # Use quantize-free check for integral value
-            try:
-                if o == o.to_integral_value():
-                    return int(o)
-            except Exception:
-                pass
-            try:
-                return float(o)
-            except Exception:
-                return str(o)
-        # Convert mappings/lists recursively
-        if isinstance(o, dict):
-            return {k: _convert(v) for k, v in o.items()}
-        if isinstance(o, list):
-            return [_convert(v) for v in o]
-        if isinstance(o, tuple):
-            return tuple(_convert(v) for v in o)
-        return o
-
-    safe_obj = _convert(obj)
-    return Response(_json.dumps(safe_obj, default=str), mimetype='application/json', status=status)
+    return Response(_dumps(obj), mimetype='application/json', status=status)
+
+
+def _loads_body():
+    """Parse the raw request body as JSON (orjson when available).
+
+    Bypasses request.get_json() and its mimetype checks and parsed-body
+    cache. Returns None for an empty body; malformed JSON raises ValueError
+    (both orjson.JSONDecodeError and json.JSONDecodeError subclass it).
+    """
+    raw = request.get_data(cache=False)
+    if not raw:
+        return None
+    if orjson is not None:
+        return orjson.loads(raw)
+    return _json.loads(raw)
+
 
+def _dumps(obj, default=None) -> bytes:
+    """Encode obj as JSON bytes (orjson when available, else stdlib)."""
+    if default is None:
+        default = _default
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTS)
+    return _json.dumps(obj, default=default).encode('utf-8')
@@ -1,8 +1,9 @@
+import sys
 from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Any
 
 
-@dataclass
+@dataclass(slots=True)
 class PLC:
     id: str
     name: str
@@ -11,7 +12,7 @@ class PLC:
     options: Dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class Tag:
     tag_id: str
     name: str
@@ -29,3 +30,16 @@ class Tag:
     description: Optional[str] = None
     enabled: bool = True
     client_visible: List[str] = field(default_factory=list)
+    # bumped by TagStore.update_tag(); lets callers cache per-tag derived
+    # data (e.g. the serialized metadata in the REST API) until it changes
+    version: int = field(default=0, compare=False, repr=False)
+
+    def __post_init__(self):
+        # plc_id/data_type/group_id repeat across thousands of tags; intern
+        # them so every tag shares one string object per distinct value.
+        if type(self.plc_id) is str:
+            self.plc_id = sys.intern(self.plc_id)
+        if type(self.data_type) is str:
+            self.data_type = sys.intern(self.data_type)
+        if type(self.group_id) is str:
+            self.group_id = sys.intern(self.group_id)
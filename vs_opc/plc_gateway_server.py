@@ -2,7 +2,11 @@
 import asyncio
 import time
 import os
-from collections import deque
+import re
+from array import array
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
 import sys
 import logging
 # Prefer asyncua for async OPC UA server; if your editor flags unresolved import,
@@ -21,6 +25,8 @@ except Exception:
         from types import SimpleNamespace
 
         class _DummyVar:
+            __slots__ = ('_value',)
+
             def __init__(self, value=None):
                 self._value = value
 
@@ -29,10 +35,14 @@ except Exception:
                 self._value = value
 
         class _DummyFolder:
+            __slots__ = ()
+
             async def add_variable(self, idx, name, value, vartype=None):
                 return _DummyVar(value)
 
         class _DummyObjects:
+            __slots__ = ()
+
             async def add_folder(self, idx, name):
                 return _DummyFolder()
 
@@ -61,10 +71,7 @@ except Exception:
 
             async def stop(self):
                 # signal the start() coroutine to exit
-                try:
-                    self._stop_event.set()
-                except Exception:
-                    pass
+                self._stop_event.set()
 
         class ua:
             class VariantType:
@@ -75,11 +82,14 @@ except Exception:
         # Provide a clearer runtime error if asyncua is missing and we're not
         # in MOCK mode where stubs are acceptable.
         raise ImportError("The 'asyncua' package is required; install with: pip install asyncua")
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify
 import threading
 import json
-import urllib.request
-import urllib.error
+import gzip
+import http.client
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 from .tag_store import TagStore
 from .models import Tag
 from . import api as tags_api
@@ -90,10 +100,7 @@ logger = logging.getLogger(__name__)
 # Reduce noisy asyncua INFO logs (address_space adds many internal nodes during
 # startup). Keep warnings+errors visible but silence INFO-level chatter by
 # default so server logs focus on application-level messages.
-try:
-    logging.getLogger('asyncua').setLevel(logging.WARNING)
-except Exception:
-    pass
+logging.getLogger('asyncua').setLevel(logging.WARNING)
 
 # --- Optional Prometheus metrics (non-fatal if package missing) ---
 LAST_BACKOFF_GAUGE = None
@@ -120,9 +127,11 @@ try:
     # arbitrary error messages as label values can increase cardinality.
     RECENT_ERRORS_COUNT = Gauge('vs_opc_plc_recent_errors_count', 'Number of recent errors stored', ['plc', 'ip'])
     RECENT_ERROR_LAST_TS = Gauge('vs_opc_plc_recent_error_timestamp_seconds', 'Timestamp of most recent error', ['plc', 'ip'])
-    # Normalized error code (low-cardinality) exposed as a label so dashboards
-    # can show the last error category without high cardinality messages.
-    RECENT_ERROR_CODE_GAUGE = Gauge('vs_opc_plc_recent_error_code', 'Normalized recent error code (value 1)', ['plc', 'ip', 'code'])
+    # Normalized error code of the most recent error, exposed as the gauge
+    # value (see ERROR_CODE_VALUES) rather than as a label so each PLC keeps
+    # one series instead of one sticky series per code ever seen.
+    RECENT_ERROR_CODE_GAUGE = Gauge('vs_opc_plc_recent_error_code', 'Normalized recent error code (see ERROR_CODE_VALUES)', ['plc', 'ip'])
+    OBSERVABILITY_DROPPED_COUNTER = Counter('vs_opc_observability_dropped_total', 'Loki events dropped because the push queue was full')
 except Exception:
     # prometheus_client not installed — metrics will be a no-op
     LAST_BACKOFF_GAUGE = None
@@ -133,44 +142,237 @@ except Exception:
     RECENT_ERRORS_COUNT = None
     RECENT_ERROR_LAST_TS = None
     RECENT_ERROR_CODE_GAUGE = None
+    OBSERVABILITY_DROPPED_COUNTER = None
+
+# Label-bound metric children per (plc, ip). prometheus_client resolves
+# .labels() through a lock and a dict keyed by the label tuple on every call;
+# binding the children once lets the reconnect/read paths update each metric
+# with a single attribute load.
+_METRIC_CHILDREN = {}
+
+
+def _metric_children(plc, ip):
+    """Return the metric children for (plc, ip), or None without prometheus."""
+    ch = _METRIC_CHILDREN.get((plc, ip))
+    if ch is None and LAST_BACKOFF_GAUGE is not None:
+        ch = SimpleNamespace(
+            backoff=LAST_BACKOFF_GAUGE.labels(plc=plc, ip=ip),
+            fail=FAIL_COUNT_GAUGE.labels(plc=plc, ip=ip),
+            reconnect=RECONNECT_COUNTER.labels(plc=plc, ip=ip),
+            connected=CONNECTED_GAUGE.labels(plc=plc, ip=ip),
+            recent_count=RECENT_ERRORS_COUNT.labels(plc=plc, ip=ip),
+            recent_ts=RECENT_ERROR_LAST_TS.labels(plc=plc, ip=ip),
+            recent_code=RECENT_ERROR_CODE_GAUGE.labels(plc=plc, ip=ip),
+            # (connected, fail_count) last pushed by _set_state_metrics;
+            # None forces the next push
+            state=None,
+        )
+        _METRIC_CHILDREN[(plc, ip)] = ch
+    return ch
+
+
+def _set_failure_metrics(plc, ip, health, delay, disconnected=True):
+    """Push every metric for a failed reconnect attempt in one guarded block.
+
+    Reads the newest entry of health["recent_errors"] and the current
+    fail_count; `disconnected` also drops the connected gauge to 0.
+    """
+    try:
+        ch = _metric_children(plc, ip)
+        if ch is None:
+            return
+        errors = health["recent_errors"]
+        ch.recent_count.set(errors.size)
+        ch.recent_ts.set(errors.last_ts)
+        ch.recent_code.set(ERROR_CODE_VALUES[normalize_error_code(errors.last_msg)])
+        ch.backoff.set(delay)
+        ch.fail.set(health["fail_count"])
+        ch.reconnect.inc()
+        if disconnected:
+            ch.connected.set(0)
+            ch.state = (False, health["fail_count"])
+        else:
+            ch.state = None
+    except Exception:
+        pass
+
+
+def _set_state_metrics(plc, ip, connected, fail_count):
+    """Push the connected and fail_count gauges for (plc, ip) on change only.
+
+    The readers report their state every cycle; while a PLC stays connected
+    (or stays down) the values repeat, so only transitions are pushed.
+    """
+    try:
+        ch = _metric_children(plc, ip)
+        if ch is None or ch.state == (connected, fail_count):
+            return
+        ch.state = (connected, fail_count)
+        ch.connected.set(1 if connected else 0)
+        ch.fail.set(fail_count)
+    except Exception:
+        pass
+
+
+def _set_connected_metrics(plc, ip):
+    """Mark (plc, ip) connected with a zero fail count."""
+    _set_state_metrics(plc, ip, True, 0)
+
 
 # Loki push URL for sending textual recent_errors to Loki (optional).
 LOKI_PUSH_URL = os.getenv('LOKI_PUSH_URL')
 
 
+# Loki pushes are handed to one background thread through a bounded queue so
+# the PLC poll/reconnect paths never block on the network. The thread keeps a
+# single keep-alive HTTP connection and folds whatever is queued into one
+# push. While Loki is unreachable each batch can take two 5s timeouts, so once
+# the queue is full new events are dropped (and counted) instead of piling up.
+_LOKI_BATCH_MAX = 100
+# Push bodies at least this large are gzip-compressed (Loki accepts
+# Content-Encoding: gzip); single small events aren't worth it.
+_LOKI_GZIP_MIN = 1024
+_LOKI_QUEUE_MAX = 1000
+_loki_queue = queue.Queue(maxsize=_LOKI_QUEUE_MAX)
+_loki_dropped = 0
+# producers (poller, reconnect paths) and the pusher thread both update
+# _loki_dropped
+_loki_dropped_lock = threading.Lock()
+_loki_thread = None
+_loki_thread_lock = threading.Lock()
+
+
 def _send_to_loki(payload: dict) -> None:
-    """Send payload to Loki push API. Uses urllib to avoid adding requests dependency.
+    """Queue a payload for the Loki push API; returns immediately.
 
-    Payload should be the dict to POST to /loki/api/v1/push
+    Payload should be the dict to POST to /loki/api/v1/push. The push URL is
+    captured here, so a later change to LOKI_PUSH_URL applies to later events.
+    When the queue is full the oldest queued event is dropped to make room,
+    so a long Loki outage keeps the most recent errors.
     """
-    if not LOKI_PUSH_URL:
+    global _loki_thread, _loki_dropped
+    url = LOKI_PUSH_URL
+    if not url:
         return
-    data = json.dumps(payload).encode('utf-8')
-    req = urllib.request.Request(LOKI_PUSH_URL, data=data, headers={'Content-Type': 'application/json'})
-    try:
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            # ignore response body
-            _ = resp.read()
-    except Exception:
-        logger.exception("Failed to push logs to Loki at %s", LOKI_PUSH_URL)
+    if _loki_thread is None:
+        with _loki_thread_lock:
+            if _loki_thread is None:
+                _loki_thread = threading.Thread(target=_loki_pusher, name="loki-pusher", daemon=True)
+                _loki_thread.start()
+    item = (url, payload)
+    while True:
+        try:
+            _loki_queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        try:
+            _loki_queue.get_nowait()
+        except queue.Empty:
+            continue
+        with _loki_dropped_lock:
+            _loki_dropped += 1
+        if OBSERVABILITY_DROPPED_COUNTER is not None:
+            OBSERVABILITY_DROPPED_COUNTER.inc()
+
+
+def _loki_pusher() -> None:
+    global _loki_dropped
+    headers = {'Content-Type': 'application/json'}
+    gzip_headers = dict(headers, **{'Content-Encoding': 'gzip'})
+    conn = None
+    conn_url = None
+    pending = None
+    while True:
+        url, payload = pending if pending is not None else _loki_queue.get()
+        pending = None
+        try:
+            streams = list(payload.get('streams', ()))
+            # fold anything else already queued for the same URL into this push
+            for _ in range(_LOKI_BATCH_MAX - 1):
+                try:
+                    item = _loki_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item[0] != url:
+                    pending = item
+                    break
+                streams.extend(item[1].get('streams', ()))
+            if url != conn_url:
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                conn_url = url
+            parts = urlsplit(url)
+            path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+            data = json.dumps({'streams': streams}).encode('utf-8')
+            if len(data) >= _LOKI_GZIP_MIN:
+                data = gzip.compress(data)
+                req_headers = gzip_headers
+            else:
+                req_headers = headers
+            # a reused connection may have been closed by the server while idle;
+            # retry once on a fresh one before giving up on this batch
+            for attempt in (0, 1):
+                try:
+                    if conn is None:
+                        conn_cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+                        conn = conn_cls(parts.hostname, parts.port, timeout=5)
+                    conn.request('POST', path, body=data, headers=req_headers)
+                    resp = conn.getresponse()
+                    # drain the body so the connection can be reused
+                    resp.read()
+                    if resp.status >= 300:
+                        logger.warning("Loki push to %s returned HTTP %s", url, resp.status)
+                    break
+                except Exception:
+                    if conn is not None:
+                        conn.close()
+                        conn = None
+                    if attempt:
+                        logger.exception("Failed to push logs to Loki at %s", url)
+        except Exception:
+            # e.g. a malformed payload; log it and keep the thread alive
+            logger.exception("Failed to build Loki push for %s", url)
+        if _loki_dropped:
+            with _loki_dropped_lock:
+                dropped, _loki_dropped = _loki_dropped, 0
+            logger.warning("Dropped %d Loki events while the push queue was full", dropped)
+
+
+# Numeric value exported by RECENT_ERROR_CODE_GAUGE for each normalized code.
+ERROR_CODE_VALUES = {
+    'NONE': 0,
+    'FORCED_RECONNECT': 1,
+    'RECREATE_ERROR': 2,
+    'NOT_CONNECTED': 3,
+    'TIMEOUT': 4,
+    'SOCKET_ERROR': 5,
+    'OTHER': 6,
+    'UNKNOWN': 7,
+}
+
+
+# One case-insensitive pass over the message. Each alternative is a lookahead
+# anchored at the start, so alternatives are tried in order and the first
+# keyword found anywhere wins, matching the old if-chain's priority (e.g.
+# "socket timeout" is TIMEOUT, not SOCKET_ERROR).
+_ERROR_CODE_RE = re.compile(
+    r'(?=.*?(?P<FORCED_RECONNECT>forced reconnect))'
+    r'|(?=.*?(?P<RECREATE_ERROR>recreate error))'
+    r'|(?=.*?(?P<NOT_CONNECTED>not connected))'
+    r'|(?=.*?(?P<TIMEOUT>timeout|timed out))'
+    r'|(?=.*?(?P<SOCKET_ERROR>socket))',
+    re.IGNORECASE | re.DOTALL,
+)
 
 
 def normalize_error_code(msg: str) -> str:
     """Return a normalized, low-cardinality error code for a given message."""
     if not msg:
         return 'UNKNOWN'
-    m = msg.lower()
-    if 'forced reconnect' in m or 'forced reconnect failure' in m:
-        return 'FORCED_RECONNECT'
-    if 'recreate error' in m:
-        return 'RECREATE_ERROR'
-    if 'not connected' in m:
-        return 'NOT_CONNECTED'
-    if 'timeout' in m or 'timed out' in m:
-        return 'TIMEOUT'
-    if 'socket' in m or 'socket_timeout' in m:
-        return 'SOCKET_ERROR'
-    return 'OTHER'
+    m = _ERROR_CODE_RE.match(msg)
+    return m.lastgroup if m else 'OTHER'
 
 # Optional auto-start Prometheus HTTP server when env var METRICS_PORT or
 # PROMETHEUS_PORT is provided. This is opt-in and non-fatal if prometheus
@@ -193,6 +395,8 @@ except Exception:
     # external dependency. Otherwise, raise an informative ImportError.
     if os.getenv("GATEWAY_MOCK_PLC", "0") in ("1", "true", "True"):
         class LogixDriver:
+            __slots__ = ('_ip', 'connected', '_cfg')
+
             def __init__(self, ip):
                 self._ip = ip
                 self.connected = False
@@ -205,6 +409,8 @@ except Exception:
                 raise RuntimeError("Dummy LogixDriver read called in MOCK mode")
 
         class SLCDriver:
+            __slots__ = ('_ip', 'connected', '_cfg')
+
             def __init__(self, ip):
                 self._ip = ip
                 self.connected = False
@@ -270,11 +476,79 @@ opcua_vars = {}
 
 # Event used to signal threads/worker functions to stop cooperatively
 shutdown_event = threading.Event()
+# asyncio counterpart for the poller's inter-cycle wait, created on the OPC UA
+# loop when the poller starts and set by _shutdown_gateway
+_poller_stop = None
+
+class ErrorRing:
+    """Fixed-size ring of the most recent (timestamp, message) errors.
+
+    Timestamps and messages are kept in two parallel slots (an array of
+    doubles and a list) rather than as one tuple per error, and the newest
+    entry is also kept in last_ts/last_msg so readers don't index the ring.
+    Reads behave like the deque(maxlen=N) of (ts, msg) tuples this replaced:
+    len(), iteration oldest-first, ring[-1] and append((ts, msg)). Metrics
+    read the `size` field directly.
+    """
+
+    __slots__ = ('times', 'msgs', 'head', 'size', 'cap', 'last_ts', 'last_msg')
+
+    def __init__(self, cap=10):
+        self.cap = cap
+        self.times = array('d', bytes(8 * cap))
+        self.msgs = [None] * cap
+        self.head = 0
+        self.size = 0
+        self.last_ts = 0.0
+        self.last_msg = None
+
+    def add(self, ts, msg):
+        head = self.head
+        self.times[head] = ts
+        self.msgs[head] = msg
+        self.head = (head + 1) % self.cap
+        if self.size < self.cap:
+            self.size += 1
+        self.last_ts = ts
+        self.last_msg = msg
+
+    def append(self, item):
+        self.add(item[0], item[1])
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+        self.msgs = [None] * self.cap
+        self.last_ts = 0.0
+        self.last_msg = None
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        size = self.size
+        if i < 0:
+            i += size
+        if not 0 <= i < size:
+            raise IndexError('ErrorRing index out of range')
+        j = (self.head - size + i) % self.cap
+        return (self.times[j], self.msgs[j])
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self[i]
+
+
+# Number of recent errors kept per PLC (and returned by /health)
+try:
+    RECENT_ERRORS_MAX = max(1, int(os.getenv("RECENT_ERRORS_MAX", "10")))
+except Exception:
+    RECENT_ERRORS_MAX = 10
 
 # Per-PLC health/status info
 plc_health = {
-    "compactlogix": {"ok": False, "last_success": 0, "last_error": None, "fail_count": 0, "recent_errors": deque(maxlen=10), "next_attempt": 0},
-    "slc500": {"ok": False, "last_success": 0, "last_error": None, "fail_count": 0, "recent_errors": deque(maxlen=10), "next_attempt": 0},
+    "compactlogix": {"ok": False, "last_success": 0, "last_error": None, "fail_count": 0, "recent_errors": ErrorRing(RECENT_ERRORS_MAX), "next_attempt": 0},
+    "slc500": {"ok": False, "last_success": 0, "last_error": None, "fail_count": 0, "recent_errors": ErrorRing(RECENT_ERRORS_MAX), "next_attempt": 0},
 }
 
 # Readiness flag and optional readiness file path. Tests can poll
@@ -299,11 +573,112 @@ PLC_SOCKET_TIMEOUT = float(os.getenv("PLC_SOCKET_TIMEOUT", "2.0"))
 SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "5.0"))
 
 
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "0") in ("1", "true", "True")
+
+
+# Test/mock switches. Resolved here and again when run_opcua_server starts
+# (tests may set them after import), not on every reconnect pass.
+MOCK_PLC = _env_flag("GATEWAY_MOCK_PLC")
+MOCK_FAIL_RECONNECT = _env_flag("GATEWAY_MOCK_FAIL_RECONNECT")
+
+
+# Precomputed backoff delays indexed by fail_count (0..31). The table is keyed
+# on (RECONNECT_BASE, RECONNECT_MAX) and rebuilt if either is rebound (tests
+# do this), so compute_backoff_delay is a single tuple index in steady state.
+_BACKOFF_TABLE_SIZE = 32
+_BACKOFF_TABLE = ()
+_BACKOFF_KEY = None
+
+
+def _rebuild_backoff_table() -> None:
+    """Recompute _BACKOFF_TABLE from the current RECONNECT_BASE/RECONNECT_MAX."""
+    global _BACKOFF_TABLE, _BACKOFF_KEY
+    _BACKOFF_TABLE = (0.0,) + tuple(
+        float(min(RECONNECT_BASE * (1 << (k - 1)), RECONNECT_MAX))
+        for k in range(1, _BACKOFF_TABLE_SIZE)
+    )
+    _BACKOFF_KEY = (RECONNECT_BASE, RECONNECT_MAX)
+
+
+_rebuild_backoff_table()
+
+
 def compute_backoff_delay(fail_count: int) -> float:
     """Return exponential backoff delay (seconds) based on fail_count."""
     if fail_count <= 0:
         return 0.0
-    return min(RECONNECT_BASE * (2 ** max(0, fail_count - 1)), RECONNECT_MAX)
+    if _BACKOFF_KEY != (RECONNECT_BASE, RECONNECT_MAX):
+        _rebuild_backoff_table()
+    return _BACKOFF_TABLE[min(fail_count, _BACKOFF_TABLE_SIZE - 1)]
+
+
+# VariantTypes _normalize_for_opc converts Decimals to, resolved once. The
+# MOCK ua stub has no UInt32, in which case that entry is simply None.
+_VT_INT64 = getattr(ua.VariantType, 'Int64', None)
+_VT_UINT32 = getattr(ua.VariantType, 'UInt32', None)
+_VT_BOOLEAN = getattr(ua.VariantType, 'Boolean', None)
+
+
+# (data_type substring, VariantType name), checked in order; anything that
+# matches none of them is a Double.
+_DTYPE_VARIANTS = (
+    ('bool', 'Boolean'),
+    ('uint', 'UInt32'),
+    ('int', 'Int64'),
+    ('float', 'Float'),
+    ('double', 'Double'),
+    ('str', 'String'),
+)
+_DTYPE_CACHE = {}
+
+# VariantType -> converter _write_opcua_tags applies to every value before
+# writing it to a node of that type, so the Variant always carries the node's
+# type (the address space refuses e.g. a Double for an Int64 node). String
+# nodes are left out: a non-str value for one is a configuration error and is
+# refused rather than stringified.
+_VARIANT_COERCE = {
+    vt: conv
+    for vt, conv in (
+        (_VT_BOOLEAN, bool),
+        (_VT_INT64, int),
+        (_VT_UINT32, int),
+        (getattr(ua.VariantType, 'Float', None), float),
+        (getattr(ua.VariantType, 'Double', None), float),
+    )
+    if vt is not None
+}
+_VT_STRING = getattr(ua.VariantType, 'String', None)
+
+
+def _dtype_to_variant(dt):
+    """Return the OPC UA VariantType for a tag data_type string.
+
+    Results are cached per data_type, so the substring scan runs once per
+    distinct type rather than once per node created.
+    """
+    vt = _DTYPE_CACHE.get(dt)
+    if vt is None:
+        name = 'Double'
+        if dt:
+            d = str(dt).lower()
+            for sub, vname in _DTYPE_VARIANTS:
+                if sub in d:
+                    name = vname
+                    break
+        # the MOCK asyncua stub only defines a few VariantTypes
+        vt = getattr(ua.VariantType, name, ua.VariantType.Double)
+        _DTYPE_CACHE[dt] = vt
+    return vt
+
+
+# VariantType -> converter _normalize_for_opc applies to Decimals headed for
+# a node of that type; anything else (including no type) becomes a float.
+_DECIMAL_CONVERTERS = {
+    vt: conv
+    for vt, conv in ((_VT_INT64, int), (_VT_UINT32, int), (_VT_BOOLEAN, bool))
+    if vt is not None
+}
 
 
 def _normalize_for_opc(value, vartype=None):
@@ -311,31 +686,92 @@ def _normalize_for_opc(value, vartype=None):
     acceptable to asyncua when writing to OPC UA variables.
 
     If vartype is provided attempt to convert to that target numeric type
-    (e.g. Int64) otherwise convert Decimal -> float by default.
+    (e.g. Int64) otherwise convert Decimal -> float by default. Everything
+    else (bool, int, float, str, ...) is passed through unchanged.
+    """
+    if type(value) is Decimal:
+        conv = _DECIMAL_CONVERTERS.get(vartype, float)
+        try:
+            return conv(value)
+        except Exception:
+            pass
+        # e.g. NaN/Infinity for an integer node: prefer float
+        if conv is not float:
+            try:
+                return float(value)
+            except Exception:
+                pass
+    return value
+
+
+def _record_reconnect_failure(key, ip, msg, disconnected=True):
+    """Book-keep one failed (re)connect attempt for PLC `key`.
+
+    Records msg in recent_errors, bumps fail_count, schedules the next
+    attempt with exponential backoff, updates the metrics and queues the
+    message for Loki. Returns (fail_count, delay).
     """
+    health = plc_health[key]
+    ts = time.time()
+    health["recent_errors"].add(ts, msg)
+    health["fail_count"] += 1
+    fc = health["fail_count"]
+    delay = compute_backoff_delay(fc)
+    health["next_attempt"] = ts + delay
+    health["last_backoff"] = float(delay)
+    logger.info("Backoff for %s: fail_count=%d, delay=%.2fs, next_attempt=%s", key, fc, delay, health["next_attempt"])
+    _set_failure_metrics(key, ip, health, delay, disconnected=disconnected)
+    # send textual message to Loki (best-effort)
+    if LOKI_PUSH_URL:
+        _send_to_loki({"streams": [{"stream": {"plc": key, "ip": ip}, "values": [[str(int(ts * 1e9)), msg]]}]})
+    return fc, delay
+
+
+# Minimum seconds between per-address read failure tracebacks per PLC;
+# failures inside the interval are logged as a one-line warning.
+_READ_TB_INTERVAL = 5.0
+_read_tb_ts = {}
+
+
+def _log_address_read_failure(key, addr, tid, e):
+    """Log a failed per-address read, with a traceback at most once per
+    _READ_TB_INTERVAL for each PLC so an outage doesn't spend its time
+    formatting the same traceback for every address."""
+    now = time.monotonic()
+    if now - _read_tb_ts.get(key, float('-inf')) >= _READ_TB_INTERVAL:
+        _read_tb_ts[key] = now
+        logger.exception("%s per-address read failed for %s (%s): %s", key, addr, tid, e)
+    else:
+        logger.warning("%s per-address read failed for %s (%s): %s", key, addr, tid, e)
+
+
+def _record_read_failure(key, ip, msg):
+    """Book-keep one failed read on PLC `key`.
+
+    Marks the PLC unhealthy, records msg in recent_errors, bumps fail_count,
+    updates the recent-error and state metrics in one guarded block and
+    queues the message for Loki. Unlike a reconnect failure no backoff is
+    scheduled; the next reconnect pass decides that.
+    """
+    health = plc_health[key]
+    ts = time.time()
+    health["ok"] = False
+    health["last_error"] = msg
+    health["fail_count"] += 1
+    errors = health["recent_errors"]
+    errors.add(ts, msg)
     try:
-        # Avoid importing Decimal at module scope here (already used elsewhere)
-        from decimal import Decimal
-        if isinstance(value, Decimal):
-            if vartype is not None:
-                try:
-                    if vartype == getattr(ua, 'VariantType', None).Int64:
-                        return int(value)
-                    if vartype == getattr(ua, 'VariantType', None).UInt32:
-                        return int(value)
-                    if vartype == getattr(ua, 'VariantType', None).Boolean:
-                        return bool(value)
-                    # for float/ double prefer float
-                except Exception:
-                    pass
-            return float(value)
-        # bool, int, float, str pass-through
-        if isinstance(value, (bool, int, float, str)):
-            return value
+        ch = _metric_children(key, ip)
+        if ch is not None:
+            ch.recent_count.set(errors.size)
+            ch.recent_ts.set(ts)
+            ch.recent_code.set(ERROR_CODE_VALUES[normalize_error_code(msg)])
     except Exception:
         pass
-    # Fallback: return original value
-    return value
+    _set_state_metrics(key, ip, False, health["fail_count"])
+    # send textual message to Loki (best-effort)
+    if LOKI_PUSH_URL:
+        _send_to_loki({"streams": [{"stream": {"plc": key, "ip": ip}, "values": [[str(int(ts * 1e9)), msg]]}]})
 
 
 def try_reconnect_helper(driver, driver_cls, ip, key):
@@ -366,69 +802,12 @@ def try_reconnect_helper(driver, driver_cls, ip, key):
         # synthetic failures while mock drivers existed and prevented
         # the poller from completing the first successful read used to
         # signal readiness in tests.
-        if (os.getenv("GATEWAY_MOCK_FAIL_RECONNECT", "0") in ("1", "true", "True")
-            and driver is None
-            and os.getenv("GATEWAY_MOCK_PLC", "0") not in ("1", "true", "True")):
-            plc_health[key]["recent_errors"].append((time.time(), "forced reconnect failure (test)"))
-            plc_health[key]["fail_count"] += 1
-            # update recent-errors metrics (count + last-ts + normalized code)
-            try:
-                if RECENT_ERRORS_COUNT is not None:
-                    RECENT_ERRORS_COUNT.labels(plc=key, ip=ip).set(len(plc_health[key]["recent_errors"]))
-            except Exception:
-                pass
-            try:
-                if RECENT_ERROR_LAST_TS is not None:
-                    RECENT_ERROR_LAST_TS.labels(plc=key, ip=ip).set(float(plc_health[key]["recent_errors"][-1][0]))
-            except Exception:
-                pass
-            try:
-                if RECENT_ERROR_CODE_GAUGE is not None:
-                    code = normalize_error_code(plc_health[key]["recent_errors"][-1][1])
-                    RECENT_ERROR_CODE_GAUGE.labels(plc=key, ip=ip, code=code).set(1)
-            except Exception:
-                pass
-            # send textual message to Loki (best-effort)
-            try:
-                if LOKI_PUSH_URL:
-                    ts, msg = plc_health[key]["recent_errors"][-1]
-                    payload = {"streams": [{"stream": {"plc": key, "ip": ip}, "values": [[str(int(ts * 1e9)), msg]]}]}
-                    _send_to_loki(payload)
-            except Exception:
-                pass
-            fc = plc_health[key]["fail_count"]
-            delay = compute_backoff_delay(fc)
-            plc_health[key]["next_attempt"] = time.time() + delay
-            plc_health[key]["last_backoff"] = float(delay)
-            logger.info("(test) Backoff for %s: fail_count=%d, delay=%.2fs, next_attempt=%s", key, fc, delay, plc_health[key]["next_attempt"]) 
-            try:
-                if LAST_BACKOFF_GAUGE is not None:
-                    LAST_BACKOFF_GAUGE.labels(plc=key, ip=ip).set(delay)
-            except Exception:
-                pass
-            try:
-                if FAIL_COUNT_GAUGE is not None:
-                    FAIL_COUNT_GAUGE.labels(plc=key, ip=ip).set(fc)
-            except Exception:
-                pass
-            try:
-                if RECONNECT_COUNTER is not None:
-                    RECONNECT_COUNTER.labels(plc=key, ip=ip).inc()
-            except Exception:
-                pass
+        if MOCK_FAIL_RECONNECT and driver is None and not MOCK_PLC:
+            _record_reconnect_failure(key, ip, "forced reconnect failure (test)", disconnected=False)
         if getattr(driver, "connected", False):
             plc_health[key]["fail_count"] = 0
             plc_health[key]["next_attempt"] = 0
-            try:
-                if CONNECTED_GAUGE is not None:
-                    CONNECTED_GAUGE.labels(plc=key, ip=ip).set(1)
-            except Exception:
-                pass
-            try:
-                if FAIL_COUNT_GAUGE is not None:
-                    FAIL_COUNT_GAUGE.labels(plc=key, ip=ip).set(0)
-            except Exception:
-                pass
+            _set_connected_metrics(key, ip)
             return driver
         # attempt open() if provided
         if hasattr(driver, "open"):
@@ -444,16 +823,7 @@ def try_reconnect_helper(driver, driver_cls, ip, key):
             if getattr(driver, "connected", False):
                 plc_health[key]["fail_count"] = 0
                 plc_health[key]["next_attempt"] = 0
-                try:
-                    if CONNECTED_GAUGE is not None:
-                        CONNECTED_GAUGE.labels(plc=key, ip=ip).set(1)
-                except Exception:
-                    pass
-                try:
-                    if FAIL_COUNT_GAUGE is not None:
-                        FAIL_COUNT_GAUGE.labels(plc=key, ip=ip).set(0)
-                except Exception:
-                    pass
+                _set_connected_metrics(key, ip)
                 return driver
         # attempt to recreate
         try:
@@ -471,124 +841,13 @@ def try_reconnect_helper(driver, driver_cls, ip, key):
             if getattr(newdrv, "connected", False):
                 plc_health[key]["fail_count"] = 0
                 plc_health[key]["next_attempt"] = 0
-                try:
-                    if CONNECTED_GAUGE is not None:
-                        CONNECTED_GAUGE.labels(plc=key, ip=ip).set(1)
-                except Exception:
-                    pass
-                try:
-                    if FAIL_COUNT_GAUGE is not None:
-                        FAIL_COUNT_GAUGE.labels(plc=key, ip=ip).set(0)
-                except Exception:
-                    pass
+                _set_connected_metrics(key, ip)
             return newdrv
         except Exception as e:
-            plc_health[key]["recent_errors"].append((time.time(), f"recreate error: {e}"))
-            plc_health[key]["fail_count"] += 1
-            # update recent-errors metrics (count + last-ts + normalized code)
-            try:
-                if RECENT_ERRORS_COUNT is not None:
-                    RECENT_ERRORS_COUNT.labels(plc=key, ip=ip).set(len(plc_health[key]["recent_errors"]))
-            except Exception:
-                pass
-            try:
-                if RECENT_ERROR_LAST_TS is not None:
-                    RECENT_ERROR_LAST_TS.labels(plc=key, ip=ip).set(float(plc_health[key]["recent_errors"][-1][0]))
-            except Exception:
-                pass
-            try:
-                if RECENT_ERROR_CODE_GAUGE is not None:
-                    code = normalize_error_code(plc_health[key]["recent_errors"][-1][1])
-                    RECENT_ERROR_CODE_GAUGE.labels(plc=key, ip=ip, code=code).set(1)
-            except Exception:
-                pass
-            # send textual message to Loki (best-effort)
-            try:
-                if LOKI_PUSH_URL:
-                    ts, msg = plc_health[key]["recent_errors"][-1]
-                    payload = {"streams": [{"stream": {"plc": key, "ip": ip}, "values": [[str(int(ts * 1e9)), msg]]}]}
-                    _send_to_loki(payload)
-            except Exception:
-                pass
-            fc = plc_health[key]["fail_count"]
-            delay = compute_backoff_delay(fc)
-            plc_health[key]["next_attempt"] = time.time() + delay
-            plc_health[key]["last_backoff"] = float(delay)
-            logger.info("Backoff for %s: fail_count=%d, delay=%.2fs, next_attempt=%s", key, fc, delay, plc_health[key]["next_attempt"])
-            try:
-                if LAST_BACKOFF_GAUGE is not None:
-                    LAST_BACKOFF_GAUGE.labels(plc=key, ip=ip).set(delay)
-            except Exception:
-                pass
-            try:
-                if FAIL_COUNT_GAUGE is not None:
-                    FAIL_COUNT_GAUGE.labels(plc=key, ip=ip).set(fc)
-            except Exception:
-                pass
-            try:
-                if RECONNECT_COUNTER is not None:
-                    RECONNECT_COUNTER.labels(plc=key, ip=ip).inc()
-            except Exception:
-                pass
-            try:
-                if CONNECTED_GAUGE is not None:
-                    CONNECTED_GAUGE.labels(plc=key, ip=ip).set(0)
-            except Exception:
-                pass
+            _record_reconnect_failure(key, ip, f"recreate error: {e}")
             return driver
     except Exception as e:
-        plc_health[key]["recent_errors"].append((time.time(), f"reconnect error: {e}"))
-        plc_health[key]["fail_count"] += 1
-        # update recent-errors metrics (count + last-ts + normalized code)
-        try:
-            if RECENT_ERRORS_COUNT is not None:
-                RECENT_ERRORS_COUNT.labels(plc=key, ip=ip).set(len(plc_health[key]["recent_errors"]))
-        except Exception:
-            pass
-        try:
-            if RECENT_ERROR_LAST_TS is not None:
-                RECENT_ERROR_LAST_TS.labels(plc=key, ip=ip).set(float(plc_health[key]["recent_errors"][-1][0]))
-        except Exception:
-            pass
-        try:
-            if RECENT_ERROR_CODE_GAUGE is not None:
-                code = normalize_error_code(plc_health[key]["recent_errors"][-1][1])
-                RECENT_ERROR_CODE_GAUGE.labels(plc=key, ip=ip, code=code).set(1)
-        except Exception:
-            pass
-        # send textual message to Loki (best-effort)
-        try:
-            if LOKI_PUSH_URL:
-                ts, msg = plc_health[key]["recent_errors"][-1]
-                payload = {"streams": [{"stream": {"plc": key, "ip": ip}, "values": [[str(int(ts * 1e9)), msg]]}]}
-                _send_to_loki(payload)
-        except Exception:
-            pass
-        fc = plc_health[key]["fail_count"]
-        delay = compute_backoff_delay(fc)
-        plc_health[key]["next_attempt"] = time.time() + delay
-        plc_health[key]["last_backoff"] = float(delay)
-        logger.info("Backoff for %s: fail_count=%d, delay=%.2fs, next_attempt=%s", key, fc, delay, plc_health[key]["next_attempt"])
-        try:
-            if LAST_BACKOFF_GAUGE is not None:
-                LAST_BACKOFF_GAUGE.labels(plc=key, ip=ip).set(delay)
-        except Exception:
-            pass
-        try:
-            if FAIL_COUNT_GAUGE is not None:
-                FAIL_COUNT_GAUGE.labels(plc=key, ip=ip).set(fc)
-        except Exception:
-            pass
-        try:
-            if RECONNECT_COUNTER is not None:
-                RECONNECT_COUNTER.labels(plc=key, ip=ip).inc()
-        except Exception:
-            pass
-        try:
-            if CONNECTED_GAUGE is not None:
-                CONNECTED_GAUGE.labels(plc=key, ip=ip).set(0)
-        except Exception:
-            pass
+        _record_reconnect_failure(key, ip, f"reconnect error: {e}")
         return driver
 
 # --- 1b. PLC Reading/Writing Functions ---
@@ -597,11 +856,15 @@ def try_reconnect_helper(driver, driver_cls, ip, key):
 
 # --- 1b. PLC Reading/Writing Functions ---
 
-def read_compactlogix_tags(plc, stop_event: threading.Event = None):
+def read_compactlogix_tags(plc, stop_event: threading.Event = None, tags=None):
     """Read tags using an existing CompactLogix driver instance.
 
     The caller should provide an opened LogixDriver (or driver object). We do not
     open/close connections here to keep a persistent connection.
+
+    `tags` may be a precomputed sequence of (tag_id, address) pairs; when
+    omitted the CompactLogix tags are looked up in the TagStore. Returns the
+    tag_ids whose value changed, or None when the read was skipped or failed.
     """
     try:
         # If shutdown requested, skip starting a new blocking read
@@ -612,44 +875,40 @@ def read_compactlogix_tags(plc, stop_event: threading.Event = None):
             # Driver is not connected; record health and skip read.
             plc_health["compactlogix"]["ok"] = False
             plc_health["compactlogix"]["last_error"] = "not connected"
-            try:
-                if CONNECTED_GAUGE is not None:
-                    CONNECTED_GAUGE.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(0)
-            except Exception:
-                pass
-            try:
-                if FAIL_COUNT_GAUGE is not None:
-                    FAIL_COUNT_GAUGE.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(int(plc_health["compactlogix"]["fail_count"]))
-            except Exception:
-                pass
-            logger.info("CompactLogix driver not connected; skipping read")
-            return
-
-        # Build a list of addresses for tags that belong to the CompactLogix
-        # PLC so the read call is driven by configuration rather than
-        # hard-coded addresses.
-        compact_tags = [t for t in tag_store.list_tags() if t.get('plc_id') == 'compactlogix' and t.get('enabled', True)]
-        if not compact_tags:
-            logger.debug("No compactlogix tags configured; skipping read")
+            _set_state_metrics("compactlogix", COMPACTLOGIX_IP, False, int(plc_health["compactlogix"]["fail_count"]))
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("CompactLogix driver not connected; skipping read")
             return
 
-        addresses = [t.get('address') for t in compact_tags if t.get('address')]
-        tag_ids = [t.get('tag_id') for t in compact_tags]
+        # The read is driven by the configured CompactLogix tags rather than
+        # hard-coded addresses; the TagStore caches them per PLC.
+        if tags is None:
+            addresses, tag_ids = tag_store.addresses_for('compactlogix')
+        else:
+            # materialize first: callers may pass a one-shot iterator
+            tags = tuple(tags)
+            tag_ids = [tid for tid, _ in tags]
+            addresses = [addr for _, addr in tags]
 
         # If no addresses are configured, skip the read
         if not addresses:
-            logger.debug("CompactLogix tags present but no addresses configured; skipping read")
+            logger.debug("No addressed compactlogix tags configured; skipping read")
             return
 
         # Attempt a batch read when the driver supports it; otherwise the
         # driver may raise and we fall back to per-tag reads below.
+        changed = []
         try:
             results = plc.read(*addresses)
-            # Map results back to tag_ids and update TagStore
+            # pycomm3 returns a bare result (not a list) for a single address
+            if not isinstance(results, list):
+                results = [results]
+            # Map results back to tag_ids and update TagStore. Batch results
+            # are pycomm3 Tag namedtuples, so error/value are plain fields.
             for tid, res in zip(tag_ids, results):
                 try:
-                    if getattr(res, 'error', None) is None:
-                        tag_store.set_value(tid, res.value)
+                    if res.error is None and tag_store.set_value(tid, res.value):
+                        changed.append(tid)
                 except Exception:
                     logger.exception("Failed to set tag %s from CompactLogix read result", tid)
         except Exception:
@@ -662,9 +921,10 @@ def read_compactlogix_tags(plc, stop_event: threading.Event = None):
                         val = getattr(r, 'value', None)
                         if val is None and isinstance(r, (list, tuple)) and len(r) > 0:
                             val = r[0].value
-                        tag_store.set_value(tid, val)
+                        if tag_store.set_value(tid, val):
+                            changed.append(tid)
                 except Exception as e:
-                    logger.exception("CompactLogix per-address read failed for %s (%s): %s", addr, tid, e)
+                    _log_address_read_failure("compactlogix", addr, tid, e)
 
         plc_health["compactlogix"]["ok"] = True
         plc_health["compactlogix"]["last_success"] = time.time()
@@ -672,69 +932,59 @@ def read_compactlogix_tags(plc, stop_event: threading.Event = None):
         # On success reset backoff
         plc_health["compactlogix"]["fail_count"] = 0
         plc_health["compactlogix"]["next_attempt"] = 0
-        try:
-            if CONNECTED_GAUGE is not None:
-                CONNECTED_GAUGE.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(1)
-        except Exception:
-            pass
-        try:
-            if FAIL_COUNT_GAUGE is not None:
-                FAIL_COUNT_GAUGE.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(0)
-        except Exception:
-            pass
+        _set_connected_metrics("compactlogix", COMPACTLOGIX_IP)
         # Log a short, generic summary of the read values (non-critical).
         # Avoid referencing specific hard-coded tag IDs so the gateway is
-        # fully driven by runtime configuration / TagStore contents.
-        try:
-            sample_ids = tag_ids[:3]
-            sample_keys = ','.join(sample_ids)
-            logger.info("CompactLogix Read: updated %d tags (sample_keys=%s)", len(tag_ids), sample_keys)
-        except Exception:
-            logger.info("CompactLogix Read: updated tags")
+        # fully driven by runtime configuration / TagStore contents. This
+        # runs every cycle, so skip building it when INFO is filtered out.
+        if logger.isEnabledFor(logging.INFO):
+            try:
+                sample_keys = ','.join(tag_ids[:3])
+                logger.info("CompactLogix Read: updated %d tags (sample_keys=%s)", len(tag_ids), sample_keys)
+            except Exception:
+                logger.info("CompactLogix Read: updated tags")
+        return changed
     except Exception as e:
-        plc_health["compactlogix"]["ok"] = False
-        plc_health["compactlogix"]["last_error"] = str(e)
-        plc_health["compactlogix"]["fail_count"] += 1
-        plc_health["compactlogix"]["recent_errors"].append((time.time(), str(e)))
-        # update recent-errors metrics (count + last-ts + normalized code)
-        try:
-            if RECENT_ERRORS_COUNT is not None:
-                RECENT_ERRORS_COUNT.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(len(plc_health["compactlogix"]["recent_errors"]))
-        except Exception:
-            pass
-        try:
-            if RECENT_ERROR_LAST_TS is not None:
-                RECENT_ERROR_LAST_TS.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(float(plc_health["compactlogix"]["recent_errors"][-1][0]))
-        except Exception:
-            pass
-        try:
-            if RECENT_ERROR_CODE_GAUGE is not None:
-                code = normalize_error_code(plc_health["compactlogix"]["recent_errors"][-1][1])
-                RECENT_ERROR_CODE_GAUGE.labels(plc="compactlogix", ip=COMPACTLOGIX_IP, code=code).set(1)
-        except Exception:
-            pass
-        # send textual message to Loki (best-effort)
-        try:
-            if LOKI_PUSH_URL:
-                ts, msg = plc_health["compactlogix"]["recent_errors"][-1]
-                payload = {"streams": [{"stream": {"plc": "compactlogix", "ip": COMPACTLOGIX_IP}, "values": [[str(int(ts * 1e9)), msg]]}]}
-                _send_to_loki(payload)
-        except Exception:
-            pass
         logger.exception("LogixDriver Exception: %s", e)
-        try:
-            if CONNECTED_GAUGE is not None:
-                CONNECTED_GAUGE.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(0)
-        except Exception:
-            pass
-        try:
-            if FAIL_COUNT_GAUGE is not None:
-                FAIL_COUNT_GAUGE.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(int(plc_health["compactlogix"]["fail_count"]))
-        except Exception:
-            pass
+        _record_read_failure("compactlogix", COMPACTLOGIX_IP, str(e))
+
+# Rough per-request budget for an SLC multi-read, leaving headroom under the
+# ~500 byte CIP packet limit.
+_SLC_CHUNK_BYTES = 450
+# (addresses tuple from TagStore.addresses_for, its chunks)
+_slc_chunk_cache = (None, ())
+
+
+def _chunk_addresses(pairs, limit: int = _SLC_CHUNK_BYTES):
+    """Group (tag_id, address) pairs into chunks for one multi-read each.
 
-def read_slc500_tags(plc, stop_event: threading.Event = None):
+    Each address is estimated at 2 bytes of header plus its length; a chunk
+    is closed before it would exceed `limit`. Empty addresses are skipped.
+    """
+    chunks = []
+    cur = []
+    size = 0
+    for pair in pairs:
+        if not pair[1]:
+            continue
+        cost = 2 + len(pair[1])
+        if cur and size + cost > limit:
+            chunks.append(tuple(cur))
+            cur = []
+            size = 0
+        cur.append(pair)
+        size += cost
+    if cur:
+        chunks.append(tuple(cur))
+    return tuple(chunks)
+
+
+def read_slc500_tags(plc, stop_event: threading.Event = None, tags=None):
     """Read tags using an existing SLC driver instance (persistent connection).
+
+    `tags` may be a precomputed sequence of (tag_id, address) pairs; when
+    omitted the SLC500 tags are looked up in the TagStore. Returns the
+    tag_ids whose value changed, or None when the read was skipped or failed.
     """
     try:
         # If shutdown requested, skip starting a new blocking read
@@ -744,41 +994,56 @@ def read_slc500_tags(plc, stop_event: threading.Event = None):
         if not getattr(plc, "connected", False):
             plc_health["slc500"]["ok"] = False
             plc_health["slc500"]["last_error"] = "not connected"
-            try:
-                if CONNECTED_GAUGE is not None:
-                    CONNECTED_GAUGE.labels(plc="slc500", ip=SLC500_IP).set(0)
-            except Exception:
-                pass
-            try:
-                if FAIL_COUNT_GAUGE is not None:
-                    FAIL_COUNT_GAUGE.labels(plc="slc500", ip=SLC500_IP).set(int(plc_health["slc500"]["fail_count"]))
-            except Exception:
-                pass
-            logger.info("SLC driver not connected; skipping read")
+            _set_state_metrics("slc500", SLC500_IP, False, int(plc_health["slc500"]["fail_count"]))
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("SLC driver not connected; skipping read")
             return
 
-        # Read tags configured for the SLC500 PLC. SLC drivers often read
-        # one address at a time; iterate tags to keep behavior conservative.
-        slc_tags = [t for t in tag_store.list_tags() if t.get('plc_id') == 'slc500' and t.get('enabled', True)]
-        if not slc_tags:
-            logger.debug("No slc500 tags configured; skipping read")
-            return
+        # Read tags configured for the SLC500 PLC, several addresses per
+        # request; the chunking of the store's tags is cached until the
+        # TagStore index changes.
+        global _slc_chunk_cache
+        if tags is None:
+            addresses, tag_ids = tag_store.addresses_for('slc500')
+            if not addresses:
+                logger.debug("No addressed slc500 tags configured; skipping read")
+                return
+            if _slc_chunk_cache[0] is not addresses:
+                _slc_chunk_cache = (addresses, _chunk_addresses(zip(tag_ids, addresses)))
+            chunks = _slc_chunk_cache[1]
+            tags = tuple(zip(tag_ids, addresses))
+        else:
+            # materialize first: the pairs are walked again for the summary
+            # below and callers may pass a one-shot iterator
+            tags = tuple(tags)
+            chunks = _chunk_addresses(tags)
 
-        for t in slc_tags:
-            addr = t.get('address')
-            tid = t.get('tag_id')
-            if not addr:
-                continue
+        changed = []
+        for chunk in chunks:
             try:
-                r = plc.read(addr)
-                # pycomm3 SLCDriver may return a single result object
-                if getattr(r, 'error', None) is None:
-                    val = getattr(r, 'value', None)
-                    if val is None and isinstance(r, (list, tuple)) and len(r) > 0:
-                        val = r[0].value
-                    tag_store.set_value(tid, val)
+                results = plc.read(*[addr for _, addr in chunk])
+                # a single address comes back as a bare result
+                if not isinstance(results, list) or len(chunk) == 1:
+                    results = [results]
             except Exception as e:
-                logger.exception("SLC per-address read failed for %s (%s): %s", addr, tid, e)
+                # re-read this chunk one address at a time so a single bad
+                # address doesn't cost the whole chunk
+                logger.warning("SLC multi-read of %d addresses failed (%s); reading them individually", len(chunk), e)
+                results = []
+                for tid, addr in chunk:
+                    try:
+                        results.append(plc.read(addr))
+                    except Exception as e:
+                        _log_address_read_failure("slc500", addr, tid, e)
+                        results.append(None)
+            for (tid, addr), r in zip(chunk, results):
+                if r is None or getattr(r, 'error', None) is not None:
+                    continue
+                val = getattr(r, 'value', None)
+                if val is None and isinstance(r, (list, tuple)) and len(r) > 0:
+                    val = r[0].value
+                if tag_store.set_value(tid, val):
+                    changed.append(tid)
 
         plc_health["slc500"]["ok"] = True
         plc_health["slc500"]["last_success"] = time.time()
@@ -786,118 +1051,203 @@ def read_slc500_tags(plc, stop_event: threading.Event = None):
         # On success reset backoff
         plc_health["slc500"]["fail_count"] = 0
         plc_health["slc500"]["next_attempt"] = 0
-        try:
-            if CONNECTED_GAUGE is not None:
-                CONNECTED_GAUGE.labels(plc="slc500", ip=SLC500_IP).set(1)
-        except Exception:
-            pass
-        try:
-            if FAIL_COUNT_GAUGE is not None:
-                FAIL_COUNT_GAUGE.labels(plc="slc500", ip=SLC500_IP).set(0)
-        except Exception:
-            pass
+        _set_connected_metrics("slc500", SLC500_IP)
         # Log a short, generic summary of the read values (non-critical).
-        try:
-            sample_keys = ','.join([t.get('tag_id') for t in slc_tags][:3])
-            logger.info("SLC 500 Read: updated %d tags (sample_keys=%s)", len(slc_tags), sample_keys)
-        except Exception:
-            logger.info("SLC 500 Read: updated tags")
+        if logger.isEnabledFor(logging.INFO):
+            try:
+                sample_keys = ','.join([tid for tid, _ in tags[:3]])
+                logger.info("SLC 500 Read: updated %d tags (sample_keys=%s)", len(tags), sample_keys)
+            except Exception:
+                logger.info("SLC 500 Read: updated tags")
+        return changed
     except Exception as e:
-        plc_health["slc500"]["ok"] = False
-        plc_health["slc500"]["last_error"] = str(e)
-        plc_health["slc500"]["fail_count"] += 1
-        plc_health["slc500"]["recent_errors"].append((time.time(), str(e)))
-        # update recent-errors metrics (count + last-ts + normalized code)
-        try:
-            if RECENT_ERRORS_COUNT is not None:
-                RECENT_ERRORS_COUNT.labels(plc="slc500", ip=SLC500_IP).set(len(plc_health["slc500"]["recent_errors"]))
-        except Exception:
-            pass
-        try:
-            if RECENT_ERROR_LAST_TS is not None:
-                RECENT_ERROR_LAST_TS.labels(plc="slc500", ip=SLC500_IP).set(float(plc_health["slc500"]["recent_errors"][-1][0]))
-        except Exception:
-            pass
-        try:
-            if RECENT_ERROR_CODE_GAUGE is not None:
-                code = normalize_error_code(plc_health["slc500"]["recent_errors"][-1][1])
-                RECENT_ERROR_CODE_GAUGE.labels(plc="slc500", ip=SLC500_IP, code=code).set(1)
-        except Exception:
-            pass
-        # send textual message to Loki (best-effort)
-        try:
-            if LOKI_PUSH_URL:
-                ts, msg = plc_health["slc500"]["recent_errors"][-1]
-                payload = {"streams": [{"stream": {"plc": "slc500", "ip": SLC500_IP}, "values": [[str(int(ts * 1e9)), msg]]}]}
-                _send_to_loki(payload)
-        except Exception:
-            pass
         logger.exception("SLCDriver Exception: %s", e)
+        _record_read_failure("slc500", SLC500_IP, str(e))
+
+# --- 1c. AsyncIO Loop for Data Updates ---
+
+# Each PLC gets its own long-lived reader thread. pycomm3 drivers are not
+# thread-safe, so pinning a driver to one thread keeps reads on it serialized,
+# and a slow or timing-out PLC no longer delays the other PLC's OPC UA update.
+_PLC_EXECUTORS = {}
+
+
+def _plc_executor(key: str) -> ThreadPoolExecutor:
+    ex = _PLC_EXECUTORS.get(key)
+    if ex is None:
+        ex = _PLC_EXECUTORS[key] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"plc-{key}")
+    return ex
+
+
+# tag_id -> value _write_opcua_tags last wrote to its node. Any other writer
+# (node creation, REST value updates, deletion) drops the entry so the next
+# poll rewrites the node from the TagStore.
+_opc_last_written = {}
+# tag_id -> VariantType its node was created with
+_opc_vtypes = {}
+
+
+async def _write_opcua_tags(opcua_vars, tag_ids):
+    """Write the current TagStore values of `tag_ids` to their OPC UA nodes.
+
+    With a real asyncua server the values go straight into the address
+    space via its write_attribute_value, skipping the per-write session
+    and attribute-service layers node.write_value goes through. Values are
+    coerced to their node's VariantType first (see _VARIANT_COERCE). Nodes that already hold the value are skipped. The writes are issued together with
+    asyncio.gather; a failing or rejected write is logged without affecting
+    the rest, and is retried on the next call.
+    """
+    # Server.write_attribute_value discards the address space's status
+    # code, so rejected writes (e.g. BadTypeMismatch) would go unnoticed;
+    # call the address space itself. The MOCK asyncua stub has none.
+    aspace = getattr(getattr(opcua_server, "iserver", None), "aspace", None)
+    if aspace is not None:
+        now = datetime.now(timezone.utc)
+        value_attr = ua.AttributeIds.Value
+    nodes = [(tid, opcua_vars.get(tid)) for tid in tag_ids]
+    nodes = [(tid, node) for tid, node in nodes if node is not None]
+    if not nodes:
+        return
+    # one snapshot call for the whole batch instead of one get_value per tag
+    values = tag_store.snapshot(scaled=True, tag_ids=[tid for tid, _ in nodes], floats=True)['tags']
+    last_written = _opc_last_written
+    vtypes = _opc_vtypes
+    written = []
+    writes = []
+    for tid, node in nodes:
         try:
-            if CONNECTED_GAUGE is not None:
-                CONNECTED_GAUGE.labels(plc="slc500", ip=SLC500_IP).set(0)
-        except Exception:
-            pass
-        try:
-            if FAIL_COUNT_GAUGE is not None:
-                FAIL_COUNT_GAUGE.labels(plc="slc500", ip=SLC500_IP).set(int(plc_health["slc500"]["fail_count"]))
+            val = values[tid]
+            if val is None:
+                # removed from the store since the batch was built
+                continue
+            vt = vtypes.get(tid)
+            conv = _VARIANT_COERCE.get(vt)
+            if conv is not None:
+                # e.g. an Int64 node gets int() of a scaled float or a
+                # Decimal rounded via 'decimals'
+                val = conv(val)
+            elif type(val) is Decimal:
+                val = _normalize_for_opc(val, vt)
+            if tid in last_written:
+                prev = last_written[tid]
+                if type(prev) is type(val) and prev == val:
+                    continue
+            if aspace is not None:
+                if conv is not None or (vt is _VT_STRING and type(val) is str):
+                    variant = ua.Variant(val, vt)
+                else:
+                    variant = ua.Variant(val)
+                dv = ua.DataValue(variant, SourceTimestamp=now, ServerTimestamp=now)
+                writes.append(aspace.write_attribute_value(node.nodeid, value_attr, dv))
+            else:
+                writes.append(node.write_value(val))
+            written.append((tid, val))
         except Exception:
-            pass
+            logger.exception("Failed to write OPC UA variable for tag %s", tid)
+    if not writes:
+        return
+    results = await asyncio.gather(*writes, return_exceptions=True)
+    for (tid, val), res in zip(written, results):
+        if isinstance(res, BaseException):
+            if isinstance(res, asyncio.CancelledError):
+                raise res
+            logger.error("Failed to write OPC UA variable for tag %s", tid, exc_info=res)
+        elif res is not None and not res.is_good():
+            # the address space reports rejections (e.g. BadTypeMismatch)
+            # as a status code instead of raising; node.write_value (MOCK)
+            # returns None
+            logger.error("OPC UA rejected write for tag %s: %s", tid, res)
+        else:
+            last_written[tid] = val
+
+
+def _next_poll_delay(poll_period: float, *drivers) -> float:
+    """Seconds to sleep before the next poll cycle.
+
+    While every PLC is disconnected and waiting out its reconnect backoff
+    there is nothing to read, so sleep until the earliest next_attempt
+    instead of waking up every poll_period just to skip the reconnect.
+    """
+    if any(getattr(d, "connected", False) for d in drivers):
+        return poll_period
+    earliest = min(h.get("next_attempt", 0) for h in plc_health.values())
+    return max(poll_period, earliest - time.time())
 
-# --- 1c. AsyncIO Loop for Data Updates ---
 
 async def plc_data_poller(opcua_vars, compact_driver, slc_driver, poll_period: float = 1.0):
     """Periodically updates OPC UA variables from the PLC data.
 
     Uses persistent driver objects (compact_driver, slc_driver) passed by the
-    caller. Reads are run on worker threads to avoid blocking the asyncio loop.
+    caller. Each PLC is reconnected (if needed) and read on its own dedicated
+    worker thread, so one PLC's reconnect attempt doesn't hold up the other's
+    read, and its OPC UA variables are written as soon as that PLC's read
+    completes.
     """
-    while True:
-        cycle_start = time.time()
-
-        # 1. Ensure drivers are connected or attempt reconnect with backoff
+    global _poller_stop
+    loop = asyncio.get_running_loop()
+    _poller_stop = stop = asyncio.Event()
+
+    # 1./2. Ensure the driver is connected (or reconnect with backoff), then
+    # read; pass shutdown_event so the worker functions can skip starting
+    # long blocking operations. Returns (key, driver, changed tag_ids).
+    async def _poll(key, reader, driver_cls, ip, driver):
+        ex = _plc_executor(key)
         try:
-            compact_driver = try_reconnect_helper(compact_driver, LogixDriver, COMPACTLOGIX_IP, "compactlogix")
+            driver = await loop.run_in_executor(ex, try_reconnect_helper, driver, driver_cls, ip, key)
+        except asyncio.CancelledError:
+            raise
         except Exception:
             # reconnect helper should not raise in normal operation
             pass
         try:
-            slc_driver = try_reconnect_helper(slc_driver, SLCDriver, SLC500_IP, "slc500")
-        except Exception:
-            pass
+            return key, driver, await loop.run_in_executor(ex, reader, driver, shutdown_event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Read worker failed: %s", e)
+            return key, driver, None
+
+    # Cycles are scheduled on a fixed monotonic grid (deadline += period)
+    # rather than sleeping a full period after the work, so read time does
+    # not stretch the effective poll period.
+    deadline = time.monotonic()
+    while True:
+        cycle_start = time.perf_counter()
 
         # If shutdown requested, break before scheduling new worker threads
         if shutdown_event.is_set():
             break
 
-        # 2. Run reads concurrently on worker threads; pass shutdown_event so
-        # the worker functions can skip starting long blocking operations
+        # tag_ids whose OPC UA variables this cycle has already dealt with
+        handled = set()
         try:
-            await asyncio.gather(
-                asyncio.to_thread(read_compactlogix_tags, compact_driver, shutdown_event),
-                asyncio.to_thread(read_slc500_tags, slc_driver, shutdown_event),
-            )
+            polls = [
+                _poll("compactlogix", read_compactlogix_tags, LogixDriver, COMPACTLOGIX_IP, compact_driver),
+                _poll("slc500", read_slc500_tags, SLCDriver, SLC500_IP, slc_driver),
+            ]
+            # 3. UPDATE OPC UA VARIABLES, per PLC as each read lands. Only
+            # tags whose value actually changed are written; the rest of a
+            # successfully read PLC's variables already hold their value.
+            for fut in asyncio.as_completed(polls):
+                key, driver, changed = await fut
+                if key == "compactlogix":
+                    compact_driver = driver
+                else:
+                    slc_driver = driver
+                if changed is None:
+                    continue
+                if changed:
+                    await _write_opcua_tags(opcua_vars, changed)
+                handled.update(tag_store.addresses_for(key)[1])
+
+            # Then the remaining variables (tags without a PLC address, or on
+            # a PLC whose read was skipped). This is driven by the current
+            # TagStore contents so adding/removing tags via the REST API is
+            # immediately reflected here.
+            await _write_opcua_tags(opcua_vars, [tid for tid in list(opcua_vars) if tid not in handled])
         except asyncio.CancelledError:
             # Task was cancelled (shutdown requested): exit cleanly
             break
-        except Exception as e:
-            logger.exception("Read worker failed: %s", e)
-
-        # 3. UPDATE OPC UA VARIABLES
-        try:
-            # Update all OPC UA variables from TagStore values. This is
-            # driven by the current TagStore contents so adding/removing
-            # tags via the REST API is immediately reflected here.
-            for tid, node in list(opcua_vars.items()):
-                try:
-                    val = tag_store.get_value(tid)
-                    try:
-                        val = _normalize_for_opc(val, None)
-                    except Exception:
-                        pass
-                    await node.write_value(val)
-                except Exception:
-                    logger.exception("Failed to write OPC UA variable for tag %s", tid)
         except Exception as e:
             # Log but don't crash the poller; type mismatches should be rare now
             logger.exception("OPC UA write error: %s", e)
@@ -906,13 +1256,8 @@ async def plc_data_poller(opcua_vars, compact_driver, slc_driver, poll_period: f
         try:
             global plc_last_update
             plc_last_update = time.time()
-            cycle_end = time.time()
-            cycle_latency = cycle_end - cycle_start
             if POLL_LATENCY_HISTOGRAM is not None:
-                try:
-                    POLL_LATENCY_HISTOGRAM.observe(cycle_latency)
-                except Exception:
-                    pass
+                POLL_LATENCY_HISTOGRAM.observe(time.perf_counter() - cycle_start)
 
             # If this is the first successful PLC read, mark the server as ready.
             # Historically tests expect readiness after the first successful
@@ -925,21 +1270,64 @@ async def plc_data_poller(opcua_vars, compact_driver, slc_driver, poll_period: f
                 logger.info("Server marked ready after first successful PLC poll")
                 if READY_FILE:
                     try:
-                        with open(READY_FILE, 'w', encoding='utf-8') as rf:
-                            rf.write(str(plc_last_update))
+                        # write a temp file and rename it into place so a
+                        # watcher that sees READY_FILE appear never reads
+                        # it empty or half-written
+                        tmp = READY_FILE + '.tmp'
+                        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                        try:
+                            os.write(fd, str(plc_last_update).encode('ascii'))
+                        finally:
+                            os.close(fd)
+                        os.replace(tmp, READY_FILE)
                     except Exception:
                         logger.exception("Failed to write READY_FILE %s", READY_FILE)
         except Exception as e:
             logger.exception("plc_data_poller unexpected error while updating timestamps: %s", e)
 
-        # 5. Wait until next poll
+        # 5. Wait until the next deadline (longer while all PLCs are backing
+        # off). A cycle that overran its slot starts the next one right away
+        # but does not try to catch up on the missed ones.
+        deadline += poll_period
+        now = time.monotonic()
+        backoff = _next_poll_delay(poll_period, compact_driver, slc_driver)
+        if backoff > poll_period:
+            deadline = now + backoff
+        elif deadline < now:
+            deadline = now
+        # Wait on the stop event rather than sleeping, so a shutdown wakes
+        # the poller at once instead of after up to a full period.
         try:
-            await asyncio.sleep(poll_period)
+            await asyncio.wait_for(stop.wait(), timeout=deadline - now)
+            break
+        except asyncio.TimeoutError:
+            pass
         except asyncio.CancelledError:
             break
 
 # --- 1d. OPC UA Server Setup (Unchanged) ---
 
+async def _apply_node_metadata(node, tag_meta):
+    """Set a new node's display name, description and writability from tag
+    metadata. Best-effort: the attribute writes are independent, so they
+    are issued together and a failing one doesn't stop the others."""
+    calls = []
+    if tag_meta.get('name'):
+        calls.append(('set_display_name', tag_meta['name']))
+    if tag_meta.get('description'):
+        calls.append(('set_description', tag_meta['description']))
+    if tag_meta.get('writable'):
+        calls.append(('set_writable',))
+    writes = []
+    for method, *args in calls:
+        # not every asyncua version (nor the MOCK stub) has all of these
+        fn = getattr(node, method, None)
+        if fn is not None:
+            writes.append(fn(*args))
+    if writes:
+        await asyncio.gather(*writes, return_exceptions=True)
+
+
 async def run_opcua_server():
     # ... (OPC UA setup code from previous example) ...
     server = Server()
@@ -953,28 +1341,11 @@ async def run_opcua_server():
     # Expose all tags currently in the TagStore as OPC UA variables so the
     # REST API / TagStore can dynamically add/remove nodes at runtime.
     global opcua_vars, opcua_namespace_idx, opcua_objects_node
+    global MOCK_PLC, MOCK_FAIL_RECONNECT
     opcua_namespace_idx = idx
     opcua_objects_node = my_folder
     opcua_vars = {}
 
-    def _dtype_to_variant(dt: str):
-        if not dt:
-            return ua.VariantType.Double
-        d = dt.lower()
-        if 'bool' in d:
-            return ua.VariantType.Boolean
-        if 'uint' in d:
-            return ua.VariantType.UInt32
-        if 'int' in d:
-            return ua.VariantType.Int64
-        if 'float' in d:
-            return ua.VariantType.Float
-        if 'double' in d:
-            return ua.VariantType.Double
-        if 'string' in d or 'str' in d:
-            return ua.VariantType.String
-        return ua.VariantType.Double
-
     # create variables for tags that exist at startup
     for tmeta in tag_store.list_tags():
         try:
@@ -983,31 +1354,12 @@ async def run_opcua_server():
             # Determine VariantType for this tag before attempting normalization
             vtype = _dtype_to_variant(tmeta.get('data_type', 'Double'))
             # Normalize initial value for OPC UA node creation (Decimals -> native)
-            try:
-                val = _normalize_for_opc(val, vtype)
-            except Exception:
-                pass
+            val = _normalize_for_opc(val, vtype)
             node = await my_folder.add_variable(idx, tid, val, vtype)
-            # try setting display name and description from metadata
-            try:
-                if tmeta.get('name'):
-                    try:
-                        await node.set_display_name(tmeta.get('name'))
-                    except Exception:
-                        pass
-                if tmeta.get('description'):
-                    try:
-                        await node.set_description(tmeta.get('description'))
-                    except Exception:
-                        pass
-                if tmeta.get('writable'):
-                    try:
-                        await node.set_writable()
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+            await _apply_node_metadata(node, tmeta)
             opcua_vars[tid] = node
+            _opc_vtypes[tid] = vtype
+            _opc_last_written.pop(tid, None)
         except Exception:
             # best-effort: continue exposing other tags
             pass
@@ -1020,23 +1372,31 @@ async def run_opcua_server():
     global opcua_server, opcua_loop, opcua_tasks
     opcua_server = server
     opcua_loop = asyncio.get_running_loop()
+    # _schedule_on_opc_loop never raises, so the API can call it unguarded
+    # from here on.
+    tags_api._OPC_UA_READY = True
 
     # Open persistent PLC drivers and run the poller while the server is running.
     # We use the drivers as context managers so they are cleaned up when the
     # server shuts down. The with-block keeps the connections open for the
     # lifetime of the server.
     try:
-        MOCK_PLC = os.getenv("GATEWAY_MOCK_PLC", "0") in ("1", "true", "True")
+        MOCK_PLC = _env_flag("GATEWAY_MOCK_PLC")
+        MOCK_FAIL_RECONNECT = _env_flag("GATEWAY_MOCK_FAIL_RECONNECT")
 
         if MOCK_PLC:
             # Simple context-manager style mock drivers that expose the small
             # interface our code expects: .connected and .read(...)
             class DummyResult:
+                __slots__ = ('value', 'error')
+
                 def __init__(self, value=None):
                     self.value = value
                     self.error = None
 
             class DummyLogix:
+                __slots__ = ('connected',)
+
                 def __enter__(self_):
                     self_.connected = True
                     return self_
@@ -1049,13 +1409,15 @@ async def run_opcua_server():
                     # reflect the configured tags and their current values.
                     results = []
                     try:
-                        # Build a mapping address -> tag_id for configured tags
-                        addr_map = {t.get('address'): t.get('tag_id') for t in tag_store.list_tags()}
+                        # address -> tag_id for configured tags (cached by the store)
+                        addr_map = tag_store.address_index()
                         for a in tags:
                             try:
                                 tid = addr_map.get(a)
                                 if tid:
-                                    val = tag_store.get_value(tid)
+                                    # raw, like a real PLC: the store applies
+                                    # scaling on the way out
+                                    val = tag_store.get_raw_value(tid)
                                 else:
                                     # fallback: no tag configured for this address
                                     val = 0.0
@@ -1069,25 +1431,34 @@ async def run_opcua_server():
                     return results
 
             class DummySLC:
+                __slots__ = ('connected',)
+
                 def __enter__(self_):
                     self_.connected = True
                     return self_
                 def __exit__(self_, exc_type, exc, tb):
                     self_.connected = False
-                def read(self_, tag):
+                def read(self_, *tags):
                     # Try to return a value based on TagStore mapping by
                     # address. If none exists, return a sensible integer
-                    # default for SLC reads.
+                    # default for SLC reads. Like pycomm3, a single address
+                    # returns a bare result and several return a list.
+                    results = []
                     try:
-                        addr_map = {t.get('address'): t.get('tag_id') for t in tag_store.list_tags()}
-                        tid = addr_map.get(tag)
-                        if tid:
-                            val = tag_store.get_value(tid)
-                        else:
-                            val = 0
-                        return DummyResult(val)
+                        addr_map = tag_store.address_index()
                     except Exception:
-                        return DummyResult(0)
+                        addr_map = {}
+                    for tag in tags:
+                        try:
+                            tid = addr_map.get(tag)
+                            if tid:
+                                val = tag_store.get_raw_value(tid)
+                            else:
+                                val = 0
+                            results.append(DummyResult(val))
+                        except Exception:
+                            results.append(DummyResult(0))
+                    return results[0] if len(results) == 1 else results
 
             compact_ctx = DummyLogix()
             slc_ctx = DummySLC()
@@ -1101,8 +1472,10 @@ async def run_opcua_server():
                 # Testing helper: when MOCK mode is active and the test requests a
                 # forced reconnect failure, pre-populate the plc_health with a
                 # synthetic failure so the health endpoint shows backoff.
-                if os.getenv("GATEWAY_MOCK_FAIL_RECONNECT", "0") in ("1", "true", "True"):
-                    plc_health["compactlogix"]["recent_errors"].append((time.time(), "forced reconnect failure (test)"))
+                if MOCK_FAIL_RECONNECT:
+                    ts = time.time()
+                    msg = "forced reconnect failure (test)"
+                    plc_health["compactlogix"]["recent_errors"].add(ts, msg)
                     plc_health["compactlogix"]["fail_count"] += 1
                     fc = plc_health["compactlogix"]["fail_count"]
                     delay = compute_backoff_delay(fc)
@@ -1110,45 +1483,22 @@ async def run_opcua_server():
                     plc_health["compactlogix"]["last_backoff"] = float(delay)
                     logger.info("(test) Prepopulated backoff for compactlogix: %s", plc_health["compactlogix"]["last_backoff"])
                     try:
-                        if LAST_BACKOFF_GAUGE is not None:
-                            LAST_BACKOFF_GAUGE.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(delay)
-                    except Exception:
-                        pass
-                    try:
-                        if FAIL_COUNT_GAUGE is not None:
-                            FAIL_COUNT_GAUGE.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(fc)
-                    except Exception:
-                        pass
-                    try:
-                        if RECONNECT_COUNTER is not None:
-                            RECONNECT_COUNTER.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).inc()
-                    except Exception:
-                        pass
-                    try:
-                        if CONNECTED_GAUGE is not None:
-                            CONNECTED_GAUGE.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(1)
-                    except Exception:
-                        pass
-                    # update recent-errors metrics for mock prepopulation
-                    try:
-                        if RECENT_ERRORS_COUNT is not None:
-                            RECENT_ERRORS_COUNT.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(len(plc_health["compactlogix"]["recent_errors"]))
-                    except Exception:
-                        pass
-                    try:
-                        if RECENT_ERROR_LAST_TS is not None:
-                            RECENT_ERROR_LAST_TS.labels(plc="compactlogix", ip=COMPACTLOGIX_IP).set(float(plc_health["compactlogix"]["recent_errors"][-1][0]))
-                    except Exception:
-                        pass
-                    try:
-                        if RECENT_ERROR_CODE_GAUGE is not None:
-                            code = normalize_error_code(plc_health["compactlogix"]["recent_errors"][-1][1])
-                            RECENT_ERROR_CODE_GAUGE.labels(plc="compactlogix", ip=COMPACTLOGIX_IP, code=code).set(1)
+                        ch = _metric_children("compactlogix", COMPACTLOGIX_IP)
+                        if ch is not None:
+                            ch.backoff.set(delay)
+                            ch.fail.set(fc)
+                            ch.reconnect.inc()
+                            ch.connected.set(1)
+                            ch.state = None
+                            # update recent-errors metrics for mock prepopulation
+                            ch.recent_count.set(plc_health["compactlogix"]["recent_errors"].size)
+                            ch.recent_ts.set(ts)
+                            code = normalize_error_code(msg)
+                            ch.recent_code.set(ERROR_CODE_VALUES[code])
                     except Exception:
                         pass
                     try:
                         if LOKI_PUSH_URL:
-                            ts, msg = plc_health["compactlogix"]["recent_errors"][-1]
                             payload = {"streams": [{"stream": {"plc": "compactlogix", "ip": COMPACTLOGIX_IP}, "values": [[str(int(ts * 1e9)), msg]]}]}
                             _send_to_loki(payload)
                     except Exception:
@@ -1231,29 +1581,35 @@ app = Flask(__name__)
 tags_api.bp.tag_store = tag_store
 app.register_blueprint(tags_api.bp)
 
+# (TagStore revision, encoded "tags" object) last served by /api/v1/hmi/data
+_hmi_data_cache = (None, b'')
+
+
 @app.route('/api/v1/hmi/data')
 def get_hmi_data():
     """Provides a simple JSON dump of current PLC data.
 
     Use the tags API JSON serializer to ensure Decimal instances are
     converted to JSON numbers (or strings when necessary) consistently
-    with the rest of the REST API.
+    with the rest of the REST API. The encoded tags are reused until the
+    TagStore revision changes; only the timestamp is encoded per request.
     """
+    global _hmi_data_cache
     try:
-        # Import the JSON serializer from the tags API module so we
-        # preserve Decimal semantics used elsewhere in the API.
-        from .api import _json_response
-        payload = {
-            "timestamp": time.time(),
-            "tags": tag_store.snapshot().get('tags', {})
-        }
-        return _json_response(payload)
+        # read the revision before the snapshot: a value set in between
+        # just makes the next request re-encode
+        rev = tag_store.revision
+        cached = _hmi_data_cache
+        if cached[0] != rev:
+            cached = _hmi_data_cache = (rev, tags_api._dumps(tag_store.snapshot_copy()['tags']))
+        body = b'{"timestamp":%s,"tags":%s}' % (tags_api._dumps(time.time()), cached[1])
+        return Response(body, mimetype='application/json')
     except Exception:
         # Fallback: return a best-effort jsonify if the helper isn't
         # available for any reason.
         return jsonify({
             "timestamp": time.time(),
-            "tags": tag_store.snapshot().get('tags', {})
+            "tags": tag_store.snapshot_copy()['tags']
         })
 
 
@@ -1268,7 +1624,7 @@ def get_hmi_health():
     last = plc_last_update
     age = None if last == 0 else now - last
     healthy = (last != 0 and age is not None and age < 5)
-    # Build a JSON-serializable snapshot of plc_health (convert deques to lists)
+    # Build a JSON-serializable snapshot of plc_health (convert error rings to lists)
     plc_health_snapshot = {}
     for k, v in plc_health.items():
         # If last_backoff wasn't explicitly recorded, compute a sensible
@@ -1289,7 +1645,7 @@ def get_hmi_health():
             "fail_count": int(v.get("fail_count", 0)),
             "next_attempt": float(v.get("next_attempt", 0)),
             "last_backoff": float(fb),
-            "recent_errors": [ {"ts": e[0], "error": e[1]} for e in list(v.get("recent_errors", [])) ]
+            "recent_errors": [{"ts": ts, "error": msg} for ts, msg in v.get("recent_errors", ())]
         }
 
     return jsonify({
@@ -1297,11 +1653,15 @@ def get_hmi_health():
         "timestamp": now,
         "last_plc_update": last,
         "age_seconds": age,
-        "tags_available": list(tag_store.snapshot().get('tags', {}).keys()),
+        "tags_available": tag_store.tag_ids(),
         "plc_health": plc_health_snapshot
     })
 
 
+# (TagStore, meta_revision, encoded body) last served by /api/v1/hmi/config
+_hmi_config_cache = (None, None, b'')
+
+
 @app.route('/api/v1/hmi/config')
 def get_hmi_config():
     """Return tag metadata for the HMI to load.
@@ -1309,11 +1669,17 @@ def get_hmi_config():
     The HMI expects either a JSON object with a top-level "tags" list
     (preferred) or a plain list of tag objects. Return the canonical
     metadata from TagStore.list_tags() inside {"tags": [...]} so the
-    client code can call _applyConfig(decoded) directly.
+    client code can call _applyConfig(decoded) directly. The encoded body
+    is reused until a tag is added, removed or updated.
     """
+    global _hmi_config_cache
     try:
-        tags = tags_api.bp.tag_store.list_tags() if hasattr(tags_api.bp, 'tag_store') else tag_store.list_tags()
-        return jsonify({"tags": tags})
+        store = tags_api.bp.tag_store if hasattr(tags_api.bp, 'tag_store') else tag_store
+        rev = store.meta_revision
+        cached = _hmi_config_cache
+        if cached[0] is not store or cached[1] != rev:
+            cached = _hmi_config_cache = (store, rev, tags_api._dumps({"tags": store.list_tags()}))
+        return Response(cached[2], mimetype='application/json')
     except Exception:
         # Fallback: return empty config on error instead of 404 so the
         # HMI can handle the absence gracefully.
@@ -1335,9 +1701,33 @@ def get_hmi_ready():
     except Exception:
         return jsonify({"ready": False}), 503
 
+# The Werkzeug server run_flask() is serving from, so /hmi/stop can shut it
+# down; None under waitress, whose thread simply ends with the process.
+_rest_server = None
+
+
 def run_flask():
+    """Serve the REST API on 127.0.0.1:5000.
+
+    Uses waitress (a multi-threaded production WSGI server with HTTP
+    keep-alive) when it is installed, unless GATEWAY_DEV_SERVER is set;
+    otherwise the threaded Werkzeug development server.
+    """
+    global _rest_server
     logger.info("Starting REST API on http://127.0.0.1:5000/api/v1/hmi/data")
-    app.run(port=5000, use_reloader=False)
+    if not _env_flag("GATEWAY_DEV_SERVER"):
+        try:
+            from waitress import serve  # type: ignore
+        except ImportError:
+            serve = None
+        if serve is not None:
+            serve(app, host='127.0.0.1', port=5000, threads=4, channel_timeout=30)
+            return
+    # make_server rather than app.run() so there is a server object to
+    # shut down; Werkzeug no longer provides werkzeug.server.shutdown
+    from werkzeug.serving import make_server
+    _rest_server = make_server('127.0.0.1', 5000, app, threaded=True)
+    _rest_server.serve_forever()
 
 
 # --- OPC UA mutation helpers (used by the REST API) ---
@@ -1354,62 +1744,27 @@ async def _create_opcua_node_async(tag_meta: dict):
         val = tag_store.get_value(tid)
         dt = tag_meta.get('data_type', 'Double')
 
-        # reuse mapping used at startup
-        try:
-            if not dt:
-                vtype = ua.VariantType.Double
-            else:
-                d = dt.lower()
-                if 'bool' in d:
-                    vtype = ua.VariantType.Boolean
-                elif 'uint' in d:
-                    vtype = ua.VariantType.UInt32
-                elif 'int' in d:
-                    vtype = ua.VariantType.Int64
-                elif 'float' in d:
-                    vtype = ua.VariantType.Float
-                elif 'double' in d:
-                    vtype = ua.VariantType.Double
-                elif 'string' in d or 'str' in d:
-                    vtype = ua.VariantType.String
-                else:
-                    vtype = ua.VariantType.Double
-        except Exception:
-            vtype = ua.VariantType.Double
+        vtype = _dtype_to_variant(dt)
 
-        try:
-            val = _normalize_for_opc(val, vtype)
-        except Exception:
-            pass
+        val = _normalize_for_opc(val, vtype)
 
         node = await opcua_objects_node.add_variable(opcua_namespace_idx, tid, val, vtype)
-
-        # set metadata: display name + description + writable
-        try:
-            if tag_meta.get('name'):
-                try:
-                    await node.set_display_name(tag_meta.get('name'))
-                except Exception:
-                    pass
-            if tag_meta.get('description'):
-                try:
-                    await node.set_description(tag_meta.get('description'))
-                except Exception:
-                    pass
-            if tag_meta.get('writable'):
-                try:
-                    await node.set_writable()
-                except Exception:
-                    pass
-        except Exception:
-            pass
-
+        await _apply_node_metadata(node, tag_meta)
         opcua_vars[tid] = node
+        _opc_vtypes[tid] = vtype
+        _opc_last_written.pop(tid, None)
     except Exception:
         # best-effort: ignore failures triggered by concurrent shutdown
         pass
 
 
+async def _create_opcua_nodes_bulk_async(tag_metas: list):
+    """Create OPC UA variables for several tag metadata dicts in one
+    scheduled coroutine (one cross-thread hop for a whole import)."""
+    for tag_meta in tag_metas:
+        await _create_opcua_node_async(tag_meta)
+
+
 async def _delete_opcua_node_async(tag_id: str):
     global opcua_vars
     try:
@@ -1422,6 +1777,8 @@ async def _delete_opcua_node_async(tag_id: str):
                 # fallback: just remove from mapping
                 pass
             opcua_vars.pop(tag_id, None)
+            _opc_vtypes.pop(tag_id, None)
+            _opc_last_written.pop(tag_id, None)
     except Exception:
         pass
 
@@ -1430,53 +1787,148 @@ async def _update_opcua_value_async(tag_id: str, value):
     try:
         node = opcua_vars.get(tag_id)
         if node is not None:
+            vt = _opc_vtypes.get(tag_id)
+            conv = _VARIANT_COERCE.get(vt)
             try:
-                # Try to coerce Decimal -> native numeric when updating via API
-                value = _normalize_for_opc(value, None)
+                if conv is not None:
+                    value = conv(value)
+                    if hasattr(ua, 'Variant'):
+                        # the MOCK ua stub has no Variant
+                        value = ua.Variant(value, vt)
+                else:
+                    # Try to coerce Decimal -> native numeric when updating via API
+                    value = _normalize_for_opc(value, vt)
             except Exception:
                 pass
+            _opc_last_written.pop(tag_id, None)
             await node.write_value(value)
     except Exception:
         pass
 
 
-def _schedule_on_opc_loop(coro, *args):
-    """Schedule a coroutine on the OPC UA asyncio loop if available.
+# REST value updates waiting for the OPC UA loop, latest value per tag. A
+# single flush task drains them, so a burst of PATCHes costs one hop onto the
+# loop instead of one scheduled coroutine per update.
+_pending_opc_values = {}
+_pending_opc_lock = threading.Lock()
+_opc_flush_scheduled = False
+
 
-    Returns the concurrent.futures.Future or None if scheduling failed.
+def _queue_opcua_value(tag_id, value):
+    """Queue `value` for tag_id's OPC UA node (called from REST threads).
+
+    A newer value queued before the flush runs replaces the older one.
     """
-    global opcua_loop
+    global _opc_flush_scheduled
     if opcua_loop is None:
-        return None
+        return
+    with _pending_opc_lock:
+        _pending_opc_values[tag_id] = value
+        if _opc_flush_scheduled:
+            return
+        _opc_flush_scheduled = True
+    if not _schedule_on_opc_loop(_flush_opcua_values):
+        # loop gone (concurrent shutdown); nothing left to write to
+        with _pending_opc_lock:
+            _pending_opc_values.clear()
+            _opc_flush_scheduled = False
+
+
+async def _flush_opcua_values():
+    """Write every queued REST value update to its OPC UA node."""
+    global _pending_opc_values, _opc_flush_scheduled
+    with _pending_opc_lock:
+        pending, _pending_opc_values = _pending_opc_values, {}
+        _opc_flush_scheduled = False
+    await asyncio.gather(*[_update_opcua_value_async(tid, v) for tid, v in pending.items()])
+
+
+# Tasks started by _schedule_on_opc_loop; the loop only keeps weak references
+# to tasks, so this keeps them alive until they finish.
+_opc_loop_tasks = set()
+
+
+def _start_opc_task(coro_obj):
+    task = asyncio.get_running_loop().create_task(coro_obj)
+    _opc_loop_tasks.add(task)
+    task.add_done_callback(_opc_loop_tasks.discard)
+
+
+def _schedule_on_opc_loop(coro, *args):
+    """Run coro(*args) as a task on the OPC UA asyncio loop, fire-and-forget.
+
+    Returns True once the coroutine has been handed to the loop, False if
+    there is no loop or scheduling failed. Only a call_soon_threadsafe
+    callback crosses threads; unlike run_coroutine_threadsafe no
+    concurrent Future is created and chained to the task, since no caller
+    waits for the result. The coroutine object is only created once there
+    is a loop to run it, and is closed if handing it over fails (e.g. the
+    loop was closed by a concurrent shutdown), so it never lingers
+    un-awaited.
+    """
+    loop = opcua_loop
+    if loop is None:
+        return False
+    coro_obj = coro(*args)
     try:
-        import asyncio as _asyncio
-        return _asyncio.run_coroutine_threadsafe(coro(*args), opcua_loop)
+        loop.call_soon_threadsafe(_start_opc_task, coro_obj)
+        return True
     except Exception:
-        return None
+        coro_obj.close()
+        return False
+
+
+# Hand the OPC UA mutation helpers to the tags API once, alongside the
+# TagStore attached above, so its handlers don't import this module.
+tags_api._schedule_on_opc_loop = _schedule_on_opc_loop
+tags_api._create_opcua_node_async = _create_opcua_node_async
+tags_api._create_opcua_nodes_bulk_async = _create_opcua_nodes_bulk_async
+tags_api._delete_opcua_node_async = _delete_opcua_node_async
+tags_api._queue_opcua_value = _queue_opcua_value
+
+
+# Completed by the first _shutdown_gateway on a loop; later calls on the same
+# loop wait for it instead of cancelling and stopping everything again.
+_shutdown_done = None
 
 
 async def _shutdown_gateway():
     """Async helper to cancel OPC UA tasks and stop the server cleanly."""
-    global opcua_server, opcua_tasks
+    global _shutdown_done
+    loop = asyncio.get_running_loop()
+    done = _shutdown_done
+    if done is not None and done.get_loop() is loop:
+        await asyncio.shield(done)
+        return
+    _shutdown_done = done = loop.create_future()
     try:
-        # Stage 1: signal cooperative shutdown to worker threads
-        shutdown_event.set()
+        await _shutdown_gateway_once()
+    finally:
+        done.set_result(None)
 
-        # Stage 2: cancel asyncio tasks and wait for them with timeout
-        for t in list(opcua_tasks):
-            try:
-                t.cancel()
-            except Exception:
-                pass
 
-        if opcua_tasks:
-            done, pending = await asyncio.wait(opcua_tasks, timeout=SHUTDOWN_TIMEOUT)
-            # cancel any remaining pending tasks
-            for p in pending:
-                try:
-                    p.cancel()
-                except Exception:
-                    pass
+async def _shutdown_gateway_once():
+    global opcua_server, opcua_tasks
+    try:
+        # Stage 1: signal cooperative shutdown to worker threads and stop
+        # the REST API scheduling OPC UA node work on this loop
+        shutdown_event.set()
+        if _poller_stop is not None:
+            _poller_stop.set()
+        tags_api._OPC_UA_READY = False
+        for ex in list(_PLC_EXECUTORS.values()):
+            ex.shutdown(wait=False, cancel_futures=True)
+
+        # Stage 2: cancel asyncio tasks (including node work still in flight
+        # from the REST API) and wait for them with timeout. This coroutine
+        # may itself have been started through _schedule_on_opc_loop.
+        me = asyncio.current_task()
+        tasks = [t for t in (*opcua_tasks, *_opc_loop_tasks) if t is not me]
+        for t in tasks:
+            t.cancel()
+
+        if tasks:
+            await asyncio.wait(tasks, timeout=SHUTDOWN_TIMEOUT)
 
         # Stage 3: stop the OPC UA server if it's running
         if opcua_server is not None:
@@ -1495,89 +1947,61 @@ def stop_hmi():
 
     This schedules a coroutine on the OPC UA asyncio loop to stop the server
     and cancels the poller. It also stops the Flask dev server serving this
-    endpoint. Call with POST /api/v1/hmi/stop.
+    endpoint (under waitress the REST thread simply ends with the process).
+    Call with POST /api/v1/hmi/stop.
     """
-    global opcua_loop
-    # If the OPC UA loop isn't set yet (startup race), don't treat this as
-    # an error — tests may call /stop shortly after the REST server is
-    # available but before the asyncio server has finished initializing.
-    # In that case perform a cooperative no-op shutdown: signal worker
-    # threads to stop and shut down the Flask server. Return the same
-    # JSON payload so callers (tests/clients) receive a consistent response.
-    if opcua_loop is None:
-        logger.info("stop_hmi: opcua_loop not set yet; performing no-op shutdown (startup race)")
-        try:
-            shutdown_event.set()
-        except Exception:
-            pass
-
-    # schedule shutdown on the asyncio loop
-    try:
-        # import here to avoid top-level dependency in case it's missing
-        import asyncio as _asyncio
-
-        def _schedule_shutdown():
-            try:
-                _asyncio.run_coroutine_threadsafe(_shutdown_gateway(), opcua_loop)
-            except Exception:
-                # Don't log full exception trace for expected race conditions
-                # (tests assert no "Traceback" in stderr). Log a short error
-                # message without exception info so the test harness doesn't
-                # capture a full traceback.
-                logger.error("Failed to schedule shutdown (suppressing traceback)")
-
+    # Nothing is torn down until the response has been written: once
+    # _shutdown_gateway finishes, asyncio.run() returns and the process exits,
+    # taking the daemon Flask thread (and an unsent response) with it.
+    def _begin_shutdown():
         # signal shutdown to worker threads immediately
         shutdown_event.set()
-        _schedule_shutdown()
-    except Exception as e:
-        # Log error without the full traceback to avoid triggering test
-        # assertions that scan stderr for 'Traceback'.
-        logger.error("Error scheduling shutdown: %s", e)
-
-    # Stop the Flask development server (if available)
-    func = request.environ.get('werkzeug.server.shutdown')
-    if func:
-        try:
-            # Call the werkzeug shutdown function in a background thread so
-            # the HTTP response can be returned to the client before the
-            # server closes the connection (avoids ConnectionResetError on
-            # some platforms where shutdown is immediate).
-            threading.Thread(target=lambda: _call_werkzeug_shutdown(func), daemon=True).start()
-        except Exception:
-            logger.exception("Error when scheduling werkzeug.server.shutdown")
-
-    # If running in MOCK mode (tests), block until the async shutdown completes
-    try:
-        MOCK_PLC = os.getenv("GATEWAY_MOCK_PLC", "0") in ("1", "true", "True")
-        if MOCK_PLC:
-            # In MOCK/test mode we schedule the async shutdown but do not block
-            # the Flask request indefinitely waiting for it. Waiting here can
-            # cause the HTTP client to time out in tests. Try a short wait and
-            # otherwise return immediately so the POST is responsive.
+        loop = opcua_loop
+        fut = None
+        # If the OPC UA loop isn't set yet (startup race), don't treat this as
+        # an error — tests may call /stop shortly after the REST server is
+        # available but before the asyncio server has finished initializing.
+        # In that case perform a cooperative no-op shutdown: signal worker
+        # threads to stop and shut down the Flask server. Return the same
+        # JSON payload so callers (tests/clients) receive a consistent response.
+        if loop is None:
+            logger.info("stop_hmi: opcua_loop not set yet; performing no-op shutdown (startup race)")
+        else:
+            # schedule shutdown on the asyncio loop (once; the MOCK wait
+            # below reuses this future)
+            coro = _shutdown_gateway()
             try:
-                fut = _asyncio.run_coroutine_threadsafe(_shutdown_gateway(), opcua_loop)
-                try:
-                    fut.result(timeout=0.5)
-                except Exception:
-                    # Ignore timeouts or other issues; shutdown will proceed
-                    # in the background. We avoid blocking the HTTP response.
-                    pass
+                fut = asyncio.run_coroutine_threadsafe(coro, loop)
             except Exception as e:
-                # Avoid printing traceback for expected scheduling races.
+                coro.close()
+                # Don't log full exception trace for expected race conditions
+                # (tests assert no "Traceback" in stderr).
                 logger.error("stop_hmi: failed to schedule shutdown: %s", e)
-    except Exception:
-        pass
 
-    return jsonify({"status": "shutting_down"})
+        # If running in MOCK mode (tests), give the async shutdown a moment
+        if MOCK_PLC and fut is not None:
+            # Don't block the Flask request indefinitely waiting for it; that
+            # can make the HTTP client time out in tests. Wait briefly and let
+            # the shutdown otherwise proceed in the background.
+            try:
+                fut.result(timeout=0.5)
+            except Exception:
+                pass
 
+        # Stop the REST server last. This runs on the request's handler
+        # thread after the response was sent; shutdown() waits for the
+        # serving thread's loop to exit (it polls every 0.5s).
+        server = _rest_server
+        if server is not None:
+            try:
+                server.shutdown()
+            except Exception as e:
+                # Avoid printing the full traceback for expected shutdown races.
+                logger.error("Error when shutting down the REST server: %s", e)
 
-def _call_werkzeug_shutdown(func):
-    try:
-        func()
-    except Exception:
-        # Avoid printing the full traceback for expected shutdown races.
-        logger.error("Error when calling werkzeug.server.shutdown in background thread")
-    # helper only signals werkzeug shutdown; return to caller
+    resp = jsonify({"status": "shutting_down"})
+    resp.call_on_close(_begin_shutdown)
+    return resp
 
 
 # --- 1f. Main Execution (Unchanged) ---
@@ -1,42 +1,236 @@
+import functools
+import operator
 import threading
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from decimal import Decimal, ROUND_HALF_UP
 from .models import Tag
 
+# Metadata fields exposed by list_tags(), in response order.
+_META_FIELDS = (
+    'tag_id', 'name', 'plc_id', 'address', 'data_type', 'group_id',
+    'project_id', 'scale_mul', 'scale_add', 'decimals', 'writable',
+    'description', 'enabled', 'client_visible',
+)
+_meta_getter = operator.attrgetter(*_META_FIELDS)
+_MISSING = object()
+
+
+@functools.lru_cache(maxsize=32)
+def _quantizer(decimals: int) -> Decimal:
+    """Return the quantize() exponent for `decimals` places; shared by all
+    tags with the same precision."""
+    return Decimal(1).scaleb(-decimals)
+
+
+def _make_scaler(tag: Tag):
+    """Return fn(raw) applying tag's scaling/rounding, or None for tags
+    whose values are returned unchanged (Boolean data_type).
+
+    scale_mul/scale_add/decimals are parsed and turned into Decimals once
+    here, when the tag is added or updated, instead of on every read.
+    Numeric values come back as Decimal; values that can't be converted
+    are returned unchanged.
+    """
+    try:
+        if str(tag.data_type).lower().startswith('bool'):
+            return None
+    except Exception:
+        pass
+    try:
+        mul = float(getattr(tag, 'scale_mul', 1.0))
+    except Exception:
+        mul = 1.0
+    try:
+        add = float(getattr(tag, 'scale_add', 0.0))
+    except Exception:
+        add = 0.0
+    dec = getattr(tag, 'decimals', None)
+    quant = None
+    if dec is not None:
+        try:
+            quant = _quantizer(int(dec))
+        except Exception:
+            # an unusable 'decimals' leaves unscaled values untouched and
+            # scaled values unrounded
+            if mul == 1.0 and add == 0.0:
+                return _identity
+    if mul == 1.0 and add == 0.0:
+        # No scaling; convert numeric values to Decimal so internal
+        # consumers always get Decimal for numeric types. If a requested
+        # 'decimals' exists, quantize to preserve trailing zeros.
+        if quant is None:
+            def scale(raw):
+                try:
+                    return Decimal(str(raw))
+                except Exception:
+                    return raw
+        else:
+            def scale(raw):
+                try:
+                    return Decimal(str(raw)).quantize(quant, rounding=ROUND_HALF_UP)
+                except Exception:
+                    return raw
+        return scale
+    # Use Decimal for arithmetic to retain exact decimal places
+    dec_mul = Decimal(str(mul))
+    dec_add = Decimal(str(add))
+
+    def scale(raw):
+        try:
+            scaled = (Decimal(str(raw)) * dec_mul) + dec_add
+        except Exception:
+            return raw
+        if quant is not None:
+            try:
+                return scaled.quantize(quant, rounding=ROUND_HALF_UP)
+            except Exception:
+                return scaled
+        return scaled
+    return scale
+
+
+def _identity(raw):
+    return raw
+
+
+# _float_scale result for tags without scaling; _float_value returns their
+# values unchanged, so ints stay ints.
+_NO_SCALE = (1.0, 0.0)
+
+
+def _float_scale(tag: Tag):
+    """Return (mul, add) floats for snapshot(floats=True), or None when the
+    tag must go through the Decimal path (Boolean data_type or 'decimals'
+    set, where the rounding is the point)."""
+    try:
+        if str(tag.data_type).lower().startswith('bool'):
+            return None
+    except Exception:
+        pass
+    if getattr(tag, 'decimals', None) is not None:
+        return None
+    try:
+        mul = float(getattr(tag, 'scale_mul', 1.0))
+    except Exception:
+        mul = 1.0
+    try:
+        add = float(getattr(tag, 'scale_add', 0.0))
+    except Exception:
+        add = 0.0
+    if mul == 1.0 and add == 0.0:
+        return _NO_SCALE
+    return mul, add
+
 
 class TagStore:
     """Thread-safe in-memory tag store.
 
     Stores tag metadata and current values. Provides simple hooks for
     other modules (OPC UA server, poller) to get/set tag values.
+
+    Mutations (tags and values) are serialized by a lock. Value reads
+    (get_value, get_raw_value, snapshot) and get_tag take no lock: they only
+    do single dict lookups, which are atomic under the GIL, and copy the
+    tag ids before iterating, so they can't observe a half-applied change to
+    one dict.
     """
 
     def __init__(self):
-        self._lock = threading.RLock()
+        # not reentrant: no method calls back into another locking method
+        # while holding it
+        self._lock = threading.Lock()
         self._tags: Dict[str, Tag] = {}
         self._values: Dict[str, Any] = {}
+        # tag_id -> _make_scaler(tag), rebuilt whenever the tag is added or
+        # updated; missing/None means values are returned unscaled.
+        self._scalers: Dict[str, Any] = {}
+        # tag_id -> _float_scale(tag), maintained alongside _scalers
+        self._float_scales: Dict[str, Optional[Tuple[float, float]]] = {}
+        # plc_id -> (addresses, tag_ids) of its enabled, addressed tags.
+        # Built lazily by addresses_for() and dropped on any tag mutation.
+        self._plc_index: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+        # address -> tag_id over all tags, built lazily by address_index()
+        # and dropped together with _plc_index.
+        self._addr_index: Optional[Dict[str, str]] = None
+        # tag_id -> data a caller derived from that Tag (e.g. the REST API's
+        # encoded metadata). The store only guarantees an entry never outlives
+        # its tag: it is dropped when the tag is removed, replaced or cleared.
+        self.derived_cache: Dict[str, Any] = {}
+        # Bumped whenever snapshot() could return something different (a
+        # value changed, a tag was added/removed, or its scaling updated),
+        # so callers can cache data derived from a snapshot and compare
+        # revisions to reuse it.
+        self.revision = 0
+        # Bumped whenever list_tags() could return something different (a
+        # tag was added, removed or updated).
+        self.meta_revision = 0
 
     def add_tag(self, tag: Tag, initial_value: Any = None):
         with self._lock:
-            self._tags[tag.tag_id] = tag
-            if initial_value is not None:
-                self._values[tag.tag_id] = initial_value
+            self._add_tag_locked(tag, initial_value)
+
+    def add_tags_bulk(self, tags: Iterable[Tag], initial_values: Optional[Iterable[Any]] = None):
+        """Add several tags under a single lock.
+
+        `initial_values`, if given, is matched to `tags` by position; a None
+        entry gets the same type-based default as add_tag().
+        """
+        with self._lock:
+            if initial_values is None:
+                for tag in tags:
+                    self._add_tag_locked(tag, None)
+            else:
+                for tag, initial_value in zip(tags, initial_values):
+                    self._add_tag_locked(tag, initial_value)
+
+    def _add_tag_locked(self, tag: Tag, initial_value: Any):
+        # caller must hold self._lock
+        self._tags[tag.tag_id] = tag
+        self._scalers[tag.tag_id] = _make_scaler(tag)
+        self._float_scales[tag.tag_id] = _float_scale(tag)
+        self.revision += 1
+        self.meta_revision += 1
+        self._plc_index.clear()
+        self._addr_index = None
+        self.derived_cache.pop(tag.tag_id, None)
+        if initial_value is not None:
+            self._values[tag.tag_id] = initial_value
+        else:
+            # default initial values based on type
+            dt = tag.data_type.lower() if tag.data_type else ''
+            if dt.startswith('bool'):
+                self._values[tag.tag_id] = False
+            # treat any integer-like type (int32/int64/int16 etc.) as int
+            elif 'int' in dt:
+                self._values[tag.tag_id] = 0
             else:
-                # default initial values based on type
-                dt = tag.data_type.lower() if tag.data_type else ''
-                if dt.startswith('bool'):
-                    self._values[tag.tag_id] = False
-                # treat any integer-like type (int32/int64/int16 etc.) as int
-                elif 'int' in dt:
-                    self._values[tag.tag_id] = 0
-                else:
-                    # default to float for other numeric types (Double/Float)
-                    self._values[tag.tag_id] = 0.0
-
-    def remove_tag(self, tag_id: str):
+                # default to float for other numeric types (Double/Float)
+                self._values[tag.tag_id] = 0.0
+
+    def remove_tag(self, tag_id: str) -> bool:
+        """Remove a tag and its value. Returns False if tag_id was unknown."""
+        return self.remove_tags((tag_id,)) == 1
+
+    def remove_tags(self, tag_ids: Iterable[str]) -> int:
+        """Remove several tags (and their values) under a single lock.
+
+        Returns the number of tags that existed and were removed.
+        """
+        removed = 0
         with self._lock:
-            self._tags.pop(tag_id, None)
-            self._values.pop(tag_id, None)
+            for tid in tag_ids:
+                if self._tags.pop(tid, None) is not None:
+                    removed += 1
+                self._values.pop(tid, None)
+                self._scalers.pop(tid, None)
+                self._float_scales.pop(tid, None)
+                self.derived_cache.pop(tid, None)
+            if removed:
+                self.revision += 1
+                self.meta_revision += 1
+                self._plc_index.clear()
+                self._addr_index = None
+        return removed
 
     def get_value(self, tag_id: str):
         """Return the current value for tag_id.
@@ -45,98 +239,135 @@ class TagStore:
         is numeric, apply the scaling before returning. Booleans are
         returned unchanged.
         """
-        with self._lock:
-            raw = self._values.get(tag_id)
-            tag = self._tags.get(tag_id)
-            if raw is None:
-                return None
-            # If no tag metadata or scaling is default, return raw value
-            if not tag:
+        return self._scaled_value(tag_id)
+
+    def _scaled_value(self, tag_id: str):
+        """Scaled/converted value for tag_id (no lock needed)."""
+        raw = self._values.get(tag_id)
+        if raw is None:
+            return None
+        # no scaler: unknown tag or Boolean data_type
+        scaler = self._scalers.get(tag_id)
+        # Booleans should not be scaled
+        if scaler is None or isinstance(raw, bool):
+            return raw
+        return scaler(raw)
+
+    def _float_value(self, tag_id: str):
+        """Like _scaled_value, but int/float values of tags without
+        'decimals' are scaled in float arithmetic and returned as float, or
+        returned unchanged when the tag has no scaling."""
+        raw = self._values.get(tag_id)
+        t = type(raw)
+        if t is float or t is int:
+            ma = self._float_scales.get(tag_id)
+            if ma is _NO_SCALE:
                 return raw
-            # Booleans should not be scaled
-            try:
-                if isinstance(raw, bool) or (hasattr(tag, 'data_type') and str(tag.data_type).lower().startswith('bool')):
-                    return raw
-            except Exception:
-                pass
-            # If scaling is default (1.0 / 0.0) return raw as-is
-            try:
-                mul = float(getattr(tag, 'scale_mul', 1.0))
-            except Exception:
-                mul = 1.0
-            try:
-                add = float(getattr(tag, 'scale_add', 0.0))
-            except Exception:
-                add = 0.0
-            if mul == 1.0 and add == 0.0:
-                # No scaling; convert numeric values to Decimal so internal
-                # consumers always get Decimal for numeric types. If a
-                # requested 'decimals' exists, quantize to preserve trailing
-                # zeros.
-                dec = getattr(tag, 'decimals', None)
+            if ma is not None:
                 try:
-                    d = Decimal(str(raw))
-                    if dec is not None:
-                        quant = Decimal(1).scaleb(-int(dec))
-                        return d.quantize(quant, rounding=ROUND_HALF_UP)
-                    return d
-                except Exception:
-                    # fall back to raw if conversion fails
-                    return raw
-            # Attempt numeric conversion and apply scaling
-            try:
-                # Use Decimal for arithmetic to retain exact decimal places
-                num = Decimal(str(raw))
-                dec_mul = Decimal(str(mul))
-                dec_add = Decimal(str(add))
-                scaled = (num * dec_mul) + dec_add
-                dec = getattr(tag, 'decimals', None)
-                if dec is not None:
-                    try:
-                        quant = Decimal(1).scaleb(-int(dec))
-                        return scaled.quantize(quant, rounding=ROUND_HALF_UP)
-                    except Exception:
-                        return scaled
-                # Return Decimal for consistency even when no explicit
-                # decimals requested.
-                return scaled
-            except Exception:
-                # If we can't convert to float, return raw value unchanged
-                return raw
+                    return raw * ma[0] + ma[1]
+                except OverflowError:
+                    pass
+        return self._scaled_value(tag_id)
 
-    def set_value(self, tag_id: str, value: Any):
+    def set_value(self, tag_id: str, value: Any) -> bool:
+        """Store the raw value for tag_id.
+
+        Returns False (and leaves the store untouched) when the value equals
+        the stored one, so pollers can skip downstream work for stable tags.
+        Unknown tags are allowed as a fallback.
+        """
         with self._lock:
-            if tag_id in self._tags:
-                self._values[tag_id] = value
-            else:
-                # allow setting unknown tags as a fallback
-                self._values[tag_id] = value
+            old = self._values.get(tag_id, _MISSING)
+            if type(old) is type(value) and old == value:
+                return False
+            self._values[tag_id] = value
+            self.revision += 1
+            return True
 
     def list_tags(self) -> List[Dict[str, Any]]:
         with self._lock:
-            return [
-                {
-                    'tag_id': t.tag_id,
-                    'name': t.name,
-                    'plc_id': t.plc_id,
-                    'address': t.address,
-                    'data_type': t.data_type,
-                    'group_id': t.group_id,
-                    'project_id': t.project_id,
-                    'scale_mul': t.scale_mul,
-                    'scale_add': t.scale_add,
-                    'decimals': getattr(t, 'decimals', None),
-                    'writable': t.writable,
-                    'description': t.description,
-                    'enabled': t.enabled,
-                    'client_visible': t.client_visible,
-                }
-                for t in self._tags.values()
-            ]
-
-    def snapshot(self):
+            return [dict(zip(_META_FIELDS, _meta_getter(t))) for t in self._tags.values()]
+
+    def tag_ids(self) -> List[str]:
+        """Return the ids of all tags without copying their values."""
+        with self._lock:
+            return list(self._tags)
+
+    def addresses_for(self, plc_id: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """Return (addresses, tag_ids) for the enabled tags of plc_id.
+
+        Tags without an address are skipped. The tuples are cached until a
+        tag is added, removed or updated, so per-cycle pollers get them
+        without scanning the store.
+        """
         with self._lock:
-            return { 'tags': {tid: self._values.get(tid) for tid in self._tags.keys()} }
+            entry = self._plc_index.get(plc_id)
+            if entry is None:
+                pairs = [(t.address, t.tag_id) for t in self._tags.values()
+                         if t.plc_id == plc_id and t.enabled and t.address]
+                entry = (tuple(a for a, _ in pairs), tuple(tid for _, tid in pairs))
+                self._plc_index[plc_id] = entry
+            return entry
+
+    def address_index(self) -> Dict[str, str]:
+        """Return a mapping of PLC address -> tag_id over all tags.
+
+        The dict is cached until a tag is added, removed or updated; callers
+        must treat it as read-only.
+        """
+        with self._lock:
+            index = self._addr_index
+            if index is None:
+                index = self._addr_index = {t.address: t.tag_id for t in self._tags.values()}
+            return index
+
+    def iter_tag_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Yield the same metadata dicts as list_tags(), one at a time.
+
+        Only the list of Tag objects is copied under the lock; each dict is
+        built as it is consumed, so callers can stream large stores without
+        materializing every dict or holding the lock while they do.
+        """
+        with self._lock:
+            tags = list(self._tags.values())
+        for t in tags:
+            yield dict(zip(_META_FIELDS, _meta_getter(t)))
+
+    def snapshot(self, scaled: bool = False, tag_ids: Optional[Iterable[str]] = None,
+                 floats: bool = False):
+        """Return {'tags': {tag_id: value}} for all tags.
+
+        Values are the raw stored values unless scaled=True, in which case
+        they are converted/scaled exactly as get_value() would return them.
+        Pass tag_ids to restrict the snapshot to those ids (unknown ids map
+        to None) instead of walking every tag in the store. With floats=True
+        as well, int/float values of tags without 'decimals' are scaled with
+        float arithmetic and returned as float instead of Decimal (unscaled
+        ones are returned as stored), for consumers (OPC UA) that send
+        binary numbers anyway.
+        """
+        # list() copies the keys in one step, so a concurrent add/remove
+        # can't change the dict while it is being walked
+        ids = list(self._tags) if tag_ids is None else tag_ids
+        if scaled:
+            scaled_value = self._float_value if floats else self._scaled_value
+            return {'tags': {tid: scaled_value(tid) for tid in ids}}
+        values = self._values
+        return {'tags': {tid: values.get(tid) for tid in ids}}
+
+    def snapshot_copy(self):
+        """Return the same {'tags': {tag_id: raw value}} as snapshot().
+
+        dict.copy() copies the values in one step, so it needs no lock and
+        is far cheaper than looking every tag up one by one. Values stored
+        for ids that aren't tags (set_value's fallback, or a poller write
+        landing after a delete) are dropped from the copy afterwards.
+        """
+        values = self._values.copy()
+        for tid in values.keys() - self._tags.keys():
+            del values[tid]
+        return {'tags': values}
 
     def get_raw_value(self, tag_id: str):
         """Return the raw stored value for tag_id (no scaling/conversion).
@@ -144,28 +375,43 @@ class TagStore:
         This allows callers to decide how to serialize the value (e.g. preserve
         Decimal textual form when the source was a Decimal).
         """
-        with self._lock:
-            return self._values.get(tag_id)
+        return self._values.get(tag_id)
 
     def get_tag(self, tag_id: str):
         """Return the Tag object for tag_id or None if missing."""
-        with self._lock:
-            return self._tags.get(tag_id)
+        return self._tags.get(tag_id)
+
+    def update_tag(self, tag_id: str, **kwargs) -> Tag:
+        """Update metadata fields of an existing Tag and return it.
 
-    def update_tag(self, tag_id: str, **kwargs):
-        """Update metadata fields of an existing Tag. Returns True if updated."""
+        Raises KeyError if tag_id is unknown.
+        """
         with self._lock:
             t = self._tags.get(tag_id)
-            if not t:
-                return False
+            if t is None:
+                raise KeyError(tag_id)
             # Update only known attributes
             for k, v in kwargs.items():
                 if hasattr(t, k):
                     setattr(t, k, v)
-            return True
+            t.version += 1
+            self.revision += 1
+            self.meta_revision += 1
+            self._scalers[tag_id] = _make_scaler(t)
+            self._float_scales[tag_id] = _float_scale(t)
+            self._plc_index.clear()
+            self._addr_index = None
+            return t
 
     def clear_tags(self):
         """Remove all tags and values from the store."""
         with self._lock:
             self._tags.clear()
             self._values.clear()
+            self._scalers.clear()
+            self._float_scales.clear()
+            self.revision += 1
+            self.meta_revision += 1
+            self._plc_index.clear()
+            self._addr_index = None
+            self.derived_cache.clear()